@@ -0,0 +1,240 @@
+"""
+本地 HTTP/JSON 成绩计算接口
+
+供报名系统、现场大屏等外部系统使用，计算规则与页面中的"计算最终成绩"相同，
+结果与页面共用同一个 SQLite 赛事数据库。
+
+接口:
+    POST /events/<赛事编号>/score    提交整张成绩表，计算并发布结果，返回成绩、排名与计分空间统计
+        请求体: {"teams": [{"组别": ..., "工位": ..., "队伍名称": ..., "原始分": ...}, ...],
+                 "min_std": 5.0, "trim": 1}
+        teams 也可以是逐评委长表（含 "评委"、"分数" 列，"评分项" 可选）；
+        min_std 须在 1 到 20 之间（与页面滑动条相同），trim 须为非负整数，否则返回 400
+    GET  /events/<赛事编号>/results  最近一次发布的结果；响应体按结果版本预先序列化并缓存，
+        ETag 为结果版本号，客户端带 If-None-Match 轮询时未变化直接返回 304
+
+用法示例:
+    python api.py --host 127.0.0.1 --port 8502
+"""
+
+import argparse
+import json
+import sys
+import threading
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+import pandas as pd
+
+from instrumentation import PhaseTimer, configure_logging, logger, metrics_enabled_by_default
+from ingest import DEFAULT_TRIM, validate_team_data
+from pipeline import MIN_STD_RANGE, MIN_TEAMS, compute_total_stats, result_key
+from shared import EventRegistry, EventResult
+from store import SOURCE_API, CompetitionStore
+
+# 请求体大小上限
+MAX_BODY_BYTES = 64 * 1024 * 1024
+# 默认最小标准差保护值，与页面滑动条的初始值一致
+DEFAULT_MIN_STD = 5.0
+
+
+def parse_min_std(value):
+    """请求中的最小标准差：须为有限数值且在页面滑动条的范围内"""
+    low, high = MIN_STD_RANGE
+    min_std = float(value)
+    if not low <= min_std <= high:
+        raise ValueError(f"min_std 须在 {low:g} 到 {high:g} 之间: {value}")
+    return min_std
+
+
+def parse_trim(value):
+    """请求中去掉的最高分/最低分个数：须为非负整数"""
+    if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+        raise ValueError(f"trim 须为非负整数: {value}")
+    return value
+
+
+def serialize_result(event, result):
+    """把一次计算结果序列化为 JSON 响应体（UTF-8 字节）"""
+    def records(frame):
+        # 借助 to_json 把 NaN 写为 null、把 NumPy 数值转换为 JSON 数值
+        return json.loads(frame.to_json(orient="records", force_ascii=False))
+
+    return json.dumps({
+        "event": event,
+        "result_key": result.result_key,
+        "total_stats": {name: float(value) for name, value in result.total_stats.items()},
+        "results": records(result.result_data),
+        "space_stats": records(result.space_stats),
+    }, ensure_ascii=False).encode("utf-8")
+
+
+class ResponseCache:
+    """各赛事最近一次结果的响应体缓存，按结果版本号失效"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._bodies = {}
+
+    def get(self, event, key):
+        with self._lock:
+            cached = self._bodies.get(event)
+        return cached[1] if cached is not None and cached[0] == key else None
+
+    def put(self, event, key, body):
+        with self._lock:
+            self._bodies[event] = (key, body)
+
+
+class ScoringServer(ThreadingHTTPServer):
+    """多线程 HTTP 服务；各请求线程共享赛事数据集与响应缓存"""
+
+    daemon_threads = True
+
+    def __init__(self, address, store, timer=None):
+        super().__init__(address, ScoringHandler)
+        self.store = store
+        self.registry = EventRegistry(store)
+        self.responses = ResponseCache()
+        self.timer = timer or PhaseTimer()
+
+    def latest_response(self, event):
+        """返回 (结果版本号, 响应体)；赛事没有计算结果时返回 None
+
+        每次只查询一次赛事的结果版本号，版本未变化时直接返回缓存的响应体，
+        页面或其他进程发布新结果后自动重新读取。
+        """
+        meta = self.store.result_meta(event)
+        if meta is None:
+            return None
+        key = result_key(meta[1], meta[0])
+        body = self.responses.get(event, key)
+        if body is None:
+            saved = self.store.load_results(event)
+            if saved is None:
+                return None
+            result_data, space_stats, min_std, data_hash = saved
+            key = result_key(data_hash, min_std)
+            body = serialize_result(event, EventResult(result_data, space_stats, compute_total_stats(result_data), key))
+            self.responses.put(event, key, body)
+        return key, body
+
+
+class ScoringHandler(BaseHTTPRequestHandler):
+    server_version = "ScoringAPI/1.0"
+
+    def _route(self):
+        """解析 /events/<赛事编号>/<操作>，返回 (赛事编号, 操作)，路径不匹配时返回 (None, None)"""
+        parts = [unquote(part) for part in urlsplit(self.path).path.strip("/").split("/")]
+        if len(parts) == 3 and parts[0] == "events" and parts[1]:
+            return parts[1], parts[2]
+        return None, None
+
+    def _send_json(self, status, body=None, etag=None):
+        self.send_response(status)
+        if etag is not None:
+            self.send_header("ETag", f'"{etag}"')
+            self.send_header("Cache-Control", "no-cache")
+        if body is None:
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status, message):
+        self._send_json(status, json.dumps({"error": message}, ensure_ascii=False).encode("utf-8"))
+
+    def do_GET(self):
+        event, action = self._route()
+        if action != "results":
+            self._send_error(HTTPStatus.NOT_FOUND, "接口不存在")
+            return
+
+        latest = self.server.latest_response(event)
+        if latest is None:
+            self._send_error(HTTPStatus.NOT_FOUND, f"赛事 {event} 还没有计算结果")
+            return
+        key, body = latest
+        if self.headers.get("If-None-Match", "").strip('"') == key:
+            self._send_json(HTTPStatus.NOT_MODIFIED, etag=key)
+        else:
+            self._send_json(HTTPStatus.OK, body, etag=key)
+
+    def do_POST(self):
+        event, action = self._route()
+        if action != "score":
+            self._send_error(HTTPStatus.NOT_FOUND, "接口不存在")
+            return
+
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            self._send_error(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "请求体过大")
+            return
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            min_std = parse_min_std(payload.get("min_std", DEFAULT_MIN_STD))
+            trim = parse_trim(payload.get("trim", DEFAULT_TRIM))
+            teams = pd.DataFrame(payload.get("teams") or [])
+            team_data, warnings = validate_team_data(teams, trim)
+            if len(team_data) < MIN_TEAMS:
+                raise ValueError(f"至少需要{MIN_TEAMS}支队伍才能进行计算！")
+        except (ValueError, TypeError, AttributeError) as e:
+            # JSON 格式错误、缺少必要列、分数无效或参数类型、取值错误
+            self._send_error(HTTPStatus.BAD_REQUEST, str(e))
+            return
+
+        try:
+            result = self.server.registry.get(event).compute(team_data, min_std, self.server.timer, SOURCE_API)
+        except Exception as e:
+            logger.exception("赛事 %s 计算出错", event)
+            self._send_error(HTTPStatus.INTERNAL_SERVER_ERROR, f"计算出错: {e}")
+            return
+        body = serialize_result(event, result)
+        self.server.responses.put(event, result.result_key, body)
+        if warnings:
+            # 警告信息只附加在本次响应中，不进入缓存的结果
+            document = json.loads(body)
+            document["warnings"] = warnings
+            body = json.dumps(document, ensure_ascii=False).encode("utf-8")
+        self._send_json(HTTPStatus.OK, body, etag=result.result_key)
+
+    def log_message(self, format, *args):
+        logger.info("%s - %s", self.address_string(), format % args)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="职业技能大赛成绩统计系统（HTTP 接口）")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址，默认 127.0.0.1")
+    parser.add_argument("--port", type=int, default=8502, help="监听端口，默认 8502")
+    parser.add_argument("--db", default=None, help="赛事数据库文件，默认与页面相同（可用环境变量 SCORING_DB 指定）")
+    parser.add_argument(
+        "--metrics", action="store_true", default=metrics_enabled_by_default(),
+        help="将各阶段耗时以 JSON 行输出到标准错误（也可设置环境变量 SCORING_METRICS=1）",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    configure_logging()
+    server = ScoringServer(
+        (args.host, args.port),
+        CompetitionStore(args.db),
+        PhaseTimer(enabled=args.metrics, context={"source": "api"}),
+    )
+    print(f"成绩计算接口已启动: http://{args.host}:{args.port}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
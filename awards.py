@@ -0,0 +1,122 @@
+"""
+按获奖比例评定奖项
+
+在每个评奖分区（默认为组别，也可以是计分空间）内按最终成绩从高到低依次划分奖项：
+各奖项的累计名额为 ceil(累计比例 × 分区队伍数量)，名次线上的分数由一次 np.partition
+选出，不对分区做完整排序，耗时与队伍数量线性相关。名次线上同分的队伍按并列规则处理：
+
+    并列均获奖    同分队伍一并获得该奖项，获奖队伍可能多于名额（与"同分取最小名次"的排名一致）
+    并列均不获奖  同分队伍一并获奖会超出名额时都不获得该奖项，获奖队伍不多于名额
+"""
+
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+# 默认获奖比例：奖项名称 -> 比例，按奖项从高到低排列
+DEFAULT_AWARD_QUOTAS = {"一等奖": 0.10, "二等奖": 0.20, "三等奖": 0.30}
+# 未获奖队伍的奖项名称
+NO_AWARD = "未获奖"
+
+# 名次线同分时的处理方式
+TIE_INCLUDE = "并列均获奖"
+TIE_EXCLUDE = "并列均不获奖"
+TIE_POLICIES = [TIE_INCLUDE, TIE_EXCLUDE]
+# 可作为评奖分区的列
+AWARD_SCOPES = ["组别", "计分空间"]
+
+CUTOFF_COLUMNS = ["分区", "奖项", "累计名额", "名次线分数", "累计获奖数"]
+
+# 评奖规则：评奖分区列、获奖比例、同分处理方式，以及个别分区单独指定的获奖比例（分区取值 -> 比例）
+AwardRule = namedtuple("AwardRule", ["scope", "quotas", "tie_policy", "overrides"])
+DEFAULT_AWARD_RULE = AwardRule("组别", DEFAULT_AWARD_QUOTAS, TIE_INCLUDE, {})
+
+# 评奖结果：与成绩表对齐的奖项列（有序分类），以及各分区各奖项的名次线
+AwardResult = namedtuple("AwardResult", ["awards", "cutoffs"])
+
+
+def award_dtype(quotas=DEFAULT_AWARD_QUOTAS):
+    """奖项列的有序分类类型：各奖项从高到低，最后为未获奖"""
+    return pd.CategoricalDtype(list(quotas) + [NO_AWARD], ordered=True)
+
+
+def quota_counts(sizes, quotas):
+    """各奖项的累计名额：ceil(累计比例 × 队伍数量)，不超过队伍数量
+
+    sizes 可为标量或数组，返回形状为 sizes.shape + (奖项数,) 的整数数组。
+    减去极小量避免 0.1 + 0.2 这类浮点误差使名额多出一名。
+    """
+    sizes = np.asarray(sizes, dtype=float)[..., None]
+    counts = np.ceil(sizes * np.cumsum(list(quotas.values())) - 1e-9)
+    return np.clip(counts, 0, sizes).astype(int)
+
+
+def _cut_lines(values, counts, tie_policy):
+    """一个分区内各奖项的名次线分数，以及名次线上的同分队伍是否获奖"""
+    thresholds = np.full(len(counts), np.inf)
+    filled = counts > 0
+    if filled.any():
+        kth = counts[filled] - 1
+        # 成绩取负后部分排序：第 k 小的位置即第 k 高的分数，所有奖项在一次调用中完成
+        partitioned = np.partition(-values, np.unique(kth))
+        thresholds[filled] = -partitioned[kth]
+    if tie_policy == TIE_INCLUDE:
+        return thresholds, np.ones(len(counts), dtype=bool)
+    # 同分队伍一并获奖后的获奖队伍数量不超过名额时才包含名次线上的同分队伍
+    at_or_above = (values[:, None] >= thresholds[None, :]).sum(axis=0)
+    return thresholds, at_or_above <= counts
+
+
+def allocate_awards(result_data, rule=DEFAULT_AWARD_RULE, score_column="最终成绩"):
+    """按评奖规则在各分区内评定奖项
+
+    参数:
+        result_data: 包含评奖分区列与成绩列的成绩表
+        rule: AwardRule；overrides 中的比例须使用 rule.quotas 中的奖项名称，未列出的奖项比例为 0
+        score_column: 用于评奖的成绩列
+
+    返回:
+        AwardResult；awards 为与 result_data 行对齐的 "奖项" 列，成绩缺失的队伍为未获奖；
+        cutoffs 列见 CUTOFF_COLUMNS，名额为 0 的奖项名次线分数为空。
+    """
+    if rule.tie_policy not in TIE_POLICIES:
+        raise ValueError(f"未知的同分处理方式: {rule.tie_policy}")
+    labels = list(rule.quotas)
+    for key, quotas in rule.overrides.items():
+        unknown = set(quotas) - set(labels)
+        if unknown:
+            raise ValueError(f"分区 {key} 的获奖比例中有未定义的奖项: {', '.join(map(str, sorted(unknown)))}")
+
+    scores = result_data[score_column].to_numpy(dtype=float)
+    bands = np.full(len(scores), len(labels))
+    cutoffs = []
+    for key, index in result_data.groupby(rule.scope, sort=True, observed=True).indices.items():
+        quotas = rule.overrides.get(key, rule.quotas)
+        quotas = {label: quotas.get(label, 0.0) for label in labels}
+        index = index[~np.isnan(scores[index])]
+        values = scores[index]
+        counts = quota_counts(len(values), quotas)
+        thresholds, inclusive = _cut_lines(values, counts, rule.tie_policy)
+
+        # 达到某奖项名次线的队伍也达到其后各奖项的名次线，未达到的名次线数即为奖项等级
+        awarded = (values[:, None] > thresholds) | (inclusive & (values[:, None] == thresholds))
+        partition_bands = (~awarded).sum(axis=1)
+        bands[index] = partition_bands
+
+        awarded_counts = np.bincount(partition_bands, minlength=len(labels) + 1)[:len(labels)].cumsum()
+        cutoffs.extend(zip(
+            [key] * len(labels), labels, counts, np.where(np.isinf(thresholds), np.nan, thresholds), awarded_counts,
+        ))
+
+    awards = pd.Series(
+        pd.Categorical.from_codes(bands, dtype=award_dtype(rule.quotas)),
+        index=result_data.index,
+        name="奖项",
+    )
+    return AwardResult(awards, pd.DataFrame(cutoffs, columns=CUTOFF_COLUMNS))
+
+
+def add_awards(result_data, rule=DEFAULT_AWARD_RULE):
+    """返回增加 "奖项" 列后的成绩表副本"""
+    return result_data.assign(奖项=allocate_awards(result_data, rule).awards)
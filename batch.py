@@ -0,0 +1,117 @@
+"""
+多赛道批量处理
+
+一次处理多个赛道（或赛区）的成绩文件：各文件在独立的进程中按与页面相同的标准分转换
+和排名规则计算，再汇总为一个多工作表的 Excel 报表——首个工作表为各赛道概况，
+其后每个赛道一个成绩工作表。
+"""
+
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from pathlib import Path
+
+import pandas as pd
+import xlsxwriter
+
+from exports import EXPORT_COLUMNS, unique_sheet_names, write_excel_sheet
+from instrumentation import PhaseTimer
+from ingest import read_score_file, validate_team_data
+from pipeline import run_pipeline, single_team_warnings, team_data_checksum
+
+# 一个赛道的计算结果：赛道名称、成绩表、计分空间统计、总体统计、警告信息与成绩表校验码
+TrackResult = namedtuple("TrackResult", ["track", "result_data", "space_stats", "total_stats", "warnings", "checksum"])
+
+SUMMARY_SHEET = "赛道汇总"
+SUMMARY_COLUMNS = [
+    "赛道", "队伍数量", "组别数量", "计分空间数量", "单队伍计分空间数量", "平均分", "标准差", "最高分", "最低分",
+]
+# 合并报表的文件名
+REPORT_FILE_NAME = "多赛道成绩汇总.xlsx"
+
+
+def score_track(source, min_std, trim=0, timer=None, name=None):
+    """读取并计算一个赛道的成绩文件
+
+    参数:
+        source: 成绩文件路径，或文件内容（bytes，此时须提供 name）
+        name: 文件名，用于判断文件格式与确定赛道名称；默认取 source 的文件名
+
+    返回:
+        TrackResult，赛道名称为不含扩展名的文件名
+    """
+    name = name or Path(source).name
+    if isinstance(source, bytes):
+        source = BytesIO(source)
+    timer = timer or PhaseTimer()
+    with timer.phase("ingest", file=name) as record:
+        team_data, warnings = validate_team_data(read_score_file(source, name=name), trim)
+        record["rows"] = len(team_data)
+    result_data, space_stats, total_stats = run_pipeline(team_data, min_std, timer)
+    return TrackResult(
+        Path(name).stem, result_data, space_stats, total_stats,
+        warnings + single_team_warnings(space_stats), team_data_checksum(team_data),
+    )
+
+
+def run_batch(sources, min_std, trim=0, jobs=None, timer=None, names=None):
+    """并行计算多个赛道
+
+    参数:
+        sources: 成绩文件路径（或文件内容）列表
+        jobs: 并行进程数，None 表示使用全部 CPU 核心，1 表示在当前进程中依次计算
+        timer: 可选的 PhaseTimer，仅在当前进程中计算时记录各阶段耗时
+        names: 与 sources 对应的文件名列表，sources 为文件内容时必须提供
+
+    返回:
+        按 sources 顺序生成 (source, TrackResult 或计算时抛出的异常)
+    """
+    names = names or [None] * len(sources)
+    if jobs == 1 or len(sources) <= 1:
+        for source, name in zip(sources, names):
+            try:
+                yield source, score_track(source, min_std, trim, timer, name)
+            except Exception as e:
+                yield source, e
+        return
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [
+            pool.submit(score_track, source, min_std, trim, name=name)
+            for source, name in zip(sources, names)
+        ]
+        for source, future in zip(sources, futures):
+            try:
+                yield source, future.result()
+            except Exception as e:
+                yield source, e
+
+
+def track_summary(tracks):
+    """各赛道概况：队伍、组别、计分空间数量与原始平均分的总体统计"""
+    return pd.DataFrame([
+        {
+            "赛道": track.track,
+            "队伍数量": track.total_stats["队伍数量"],
+            "组别数量": track.result_data["组别"].nunique(),
+            "计分空间数量": len(track.space_stats),
+            "单队伍计分空间数量": int((track.space_stats["队伍数量"] <= 1).sum()),
+            "平均分": round(track.total_stats["平均分"], 2),
+            "标准差": round(track.total_stats["标准差"], 2),
+            "最高分": track.total_stats["最高分"],
+            "最低分": track.total_stats["最低分"],
+        }
+        for track in tracks
+    ], columns=SUMMARY_COLUMNS)
+
+
+def to_report_bytes(tracks):
+    """将多个赛道的结果合并为一个多工作表 Excel 报表"""
+    buffer = BytesIO()
+    workbook = xlsxwriter.Workbook(buffer, {"constant_memory": True})
+    write_excel_sheet(workbook, SUMMARY_SHEET, track_summary(tracks))
+    sheet_names = unique_sheet_names([track.track for track in tracks], reserved=[SUMMARY_SHEET], default="赛道")
+    for sheet_name, track in zip(sheet_names, tracks):
+        write_excel_sheet(workbook, sheet_name, track.result_data[EXPORT_COLUMNS])
+    workbook.close()
+    return buffer.getvalue()
@@ -0,0 +1,311 @@
+"""
+性能基准测试：生成模拟赛事数据，分阶段计时并记录内存峰值
+
+分阶段测量成绩文件读取、标准分转换、排名、统计汇总、报表导出与图表绘制，
+每次运行的结果追加写入 JSON Lines 文件，便于对比不同版本的性能。
+加上 --app 时另外用 Streamlit 的 AppTest 在全新进程中运行页面，测量冷启动（含模块导入）
+与其后热重跑的耗时。
+
+用法示例:
+    python benchmark.py --teams 20000 --stations 7 --groups 5 --skew 1.0 --singletons 3 --ties 0.2
+    python benchmark.py --teams 50000 --skip-charts --label v2 --compare
+    python benchmark.py --teams 1000 --skip-charts --app --app-reruns 10
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from io import BytesIO
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from exports import EXPORT_FORMATS
+from awards import add_awards
+from ingest import read_score_file, validate_team_data
+from pipeline import compute_total_stats
+from ranking import compute_ranks
+from scoring import compute_scores
+from store import DB_PATH_ENV
+
+# 默认组别名称，组别数量更多时以 "组别N" 补充
+GROUP_NAMES = ["高职(专科)", "高职(本科)", "高中", "中职", "普通本科"]
+# 默认参与测量的图表类型
+BENCH_CHARTS = ["group_raw", "space_final", "group_scatter", "station_bar"]
+# 测量启动耗时的页面脚本
+APP_SCRIPT = Path(__file__).with_name("main.py")
+# 页面单次运行的超时时间（秒）
+APP_TIMEOUT = 120
+
+
+def generate_competition(n_teams, n_stations=7, n_groups=5, skew=0.0, singleton_spaces=0, tie_rate=0.0, seed=0):
+    """生成模拟赛事成绩表
+
+    参数:
+        n_teams: 队伍数量（不含单队伍计分空间中的队伍）
+        n_stations: 工位数量
+        n_groups: 组别数量
+        skew: 队伍在计分空间之间分布的偏斜程度，0 为均匀分布，越大越集中于少数计分空间
+        singleton_spaces: 额外生成的只有一支队伍的计分空间数量
+        tie_rate: 分数取整到 5 分档位的队伍比例，用于制造大量同分
+        seed: 随机数种子
+
+    返回:
+        包含 "组别"、"工位"、"队伍名称"、"原始分" 列的 DataFrame
+    """
+    rng = np.random.default_rng(seed)
+    groups = (GROUP_NAMES + [f"组别{i}" for i in range(len(GROUP_NAMES) + 1, n_groups + 1)])[:n_groups]
+    stations = [f"工位{i}" for i in range(1, n_stations + 1)]
+
+    # 按 Zipf 型权重把队伍分配到各计分空间
+    n_spaces = n_stations * n_groups
+    weights = 1.0 / np.arange(1, n_spaces + 1) ** skew
+    space_codes = rng.choice(n_spaces, size=n_teams, p=weights / weights.sum())
+
+    # 各计分空间的评分尺度不同，模拟不同工位的难度差异
+    space_means = rng.uniform(60, 85, size=n_spaces)
+    space_stds = rng.uniform(3, 12, size=n_spaces)
+    scores = rng.normal(space_means[space_codes], space_stds[space_codes])
+    ties = rng.random(n_teams) < tie_rate
+    scores[ties] = np.round(scores[ties] / 5) * 5
+    scores = np.clip(scores, 0, 100).round(1)
+
+    team_data = pd.DataFrame({
+        "组别": np.array(groups, dtype=object)[space_codes % n_groups],
+        "工位": np.array(stations, dtype=object)[space_codes // n_groups],
+        "队伍名称": [f"队伍{i:06d}" for i in range(n_teams)],
+        "原始分": scores,
+    })
+
+    # 只有一支队伍的计分空间使用额外的工位
+    if singleton_spaces:
+        singles = pd.DataFrame({
+            "组别": [groups[i % n_groups] for i in range(singleton_spaces)],
+            "工位": [f"工位{n_stations + 1 + i}" for i in range(singleton_spaces)],
+            "队伍名称": [f"单队{i:04d}" for i in range(singleton_spaces)],
+            "原始分": rng.uniform(50, 95, size=singleton_spaces).round(1),
+        })
+        team_data = pd.concat([team_data, singles], ignore_index=True)
+
+    return team_data
+
+
+def measure(func, repeat):
+    """重复执行 func，返回 (结果, 最短耗时秒数, 内存峰值 MB)
+
+    计时与内存测量分开进行，避免 tracemalloc 的开销影响计时。
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, min(timings), peak / 1024 / 1024
+
+
+def run_benchmark(team_data, min_std=5.0, repeat=3, charts=BENCH_CHARTS):
+    """分阶段运行成绩计算流程，返回 {阶段名称: {"seconds": 耗时, "peak_mb": 内存峰值}}"""
+    phases = {}
+
+    def record(name, func):
+        result, seconds, peak_mb = measure(func, repeat)
+        phases[name] = {"seconds": round(seconds, 6), "peak_mb": round(peak_mb, 3)}
+        return result
+
+    csv_bytes = team_data.to_csv(index=False).encode("utf-8")
+    ingested, _ = record("ingest", lambda: validate_team_data(read_score_file(BytesIO(csv_bytes), name="bench.csv")))
+    raw_data = ingested.rename(columns={"原始分": "原始平均分"})
+
+    result_data, space_stats = record("score", lambda: compute_scores(raw_data, min_std))
+    result_data = record("rank", lambda: compute_ranks(result_data))
+    result_data = record("awards", lambda: add_awards(result_data))
+    record("stats", lambda: (
+        compute_total_stats(result_data),
+        result_data.groupby("组别", observed=True)["原始平均分"].agg(["count", "mean", "std", "min", "max"]),
+    ))
+
+    for fmt, (_, _, _, exporter) in EXPORT_FORMATS.items():
+        record(f"export_{fmt}", lambda exporter=exporter: exporter(result_data))
+
+    if charts:
+        # 图表依赖 matplotlib，仅在需要时导入
+        from charts import distribution_curves, render_chart
+        from scatter import SCATTER_CHARTS, scatter_chart, scatter_data
+        record("density", lambda: distribution_curves(result_data))
+        for chart_type in charts:
+            if chart_type in SCATTER_CHARTS:
+                # 交互式散点图在浏览器端绘制，服务端耗时为准备数据与生成图表描述
+                draw = lambda chart_type=chart_type: scatter_chart(chart_type, scatter_data(chart_type, result_data)).to_dict()
+            else:
+                draw = lambda chart_type=chart_type: render_chart(chart_type, result_data)
+            record(f"chart_{chart_type}", draw)
+
+    return phases
+
+
+# 在子进程中运行页面的代码：不导入本模块及其依赖，以页面所在目录为当前目录与模块搜索路径，
+# 第一次运行为冷启动（含 pandas、Streamlit 与页面模块的导入），其后为热重跑，以 JSON 输出各次耗时
+APP_WORKER = """
+import json, sys, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+script, reruns, timeout = sys.argv[1], int(sys.argv[2]), float(sys.argv[3])
+app = AppTest.from_file(script, default_timeout=timeout)
+app.run()
+cold = time.perf_counter() - start
+cold_peak_mb = peak_rss_mb()
+if app.exception:
+    raise SystemExit(f"页面运行出错: {app.exception[0].value}")
+warm = []
+for _ in range(reruns):
+    start = time.perf_counter()
+    app.run()
+    warm.append(time.perf_counter() - start)
+print(json.dumps({"cold": cold, "cold_peak_mb": cold_peak_mb, "warm": warm, "warm_peak_mb": peak_rss_mb()}))
+"""
+
+
+def measure_app(reruns=5, script=APP_SCRIPT):
+    """在独立进程中测量页面冷启动与热重跑（取最短耗时）的耗时，使用临时赛事数据库
+
+    script 可指向另一份代码树中的 main.py，用于对比修改前后的版本。
+    """
+    script = Path(script).resolve()
+    with tempfile.TemporaryDirectory() as tmp:
+        completed = subprocess.run(
+            [sys.executable, "-c", APP_WORKER, str(script), str(reruns), str(APP_TIMEOUT)],
+            capture_output=True, text=True, cwd=script.parent,
+            env={**os.environ, DB_PATH_ENV: str(Path(tmp) / "bench.db"), "PYTHONPATH": str(script.parent)},
+        )
+    if completed.returncode != 0:
+        detail = completed.stderr.strip().splitlines() or [f"退出码 {completed.returncode}"]
+        raise RuntimeError(f"页面测量失败: {detail[-1]}")
+    timings = json.loads(completed.stdout.strip().splitlines()[-1])
+    phases = {"app_cold_start": {"seconds": round(timings["cold"], 6), "peak_mb": round(timings["cold_peak_mb"], 3)}}
+    if timings["warm"]:
+        phases["app_warm_rerun"] = {"seconds": round(min(timings["warm"]), 6), "peak_mb": round(timings["warm_peak_mb"], 3)}
+    return phases
+
+
+def git_revision():
+    """当前代码版本（git 提交号），不在 git 仓库中时返回 "unknown" """
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True, cwd=Path(__file__).parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def load_records(path):
+    """读取历史基准测试记录"""
+    path = Path(path)
+    if not path.exists():
+        return []
+    with path.open(encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def print_comparison(current, previous):
+    """打印本次与上一次相同参数运行的分阶段耗时对比"""
+    print(f"\n对比 {previous['label'] or previous['revision']} ({previous['timestamp']}):")
+    print(f"{'阶段':<28}{'上次(s)':>12}{'本次(s)':>12}{'变化':>10}")
+    for name, phase in current["phases"].items():
+        before = previous["phases"].get(name)
+        if before is None:
+            print(f"{name:<28}{'-':>12}{phase['seconds']:>12.4f}{'-':>10}")
+            continue
+        change = (phase["seconds"] / before["seconds"] - 1) * 100 if before["seconds"] else 0.0
+        print(f"{name:<28}{before['seconds']:>12.4f}{phase['seconds']:>12.4f}{change:>9.1f}%")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="职业技能大赛成绩统计系统性能基准测试")
+    parser.add_argument("--teams", type=int, default=20000, help="队伍数量，默认 20000")
+    parser.add_argument("--stations", type=int, default=7, help="工位数量，默认 7")
+    parser.add_argument("--groups", type=int, default=5, help="组别数量，默认 5")
+    parser.add_argument("--skew", type=float, default=0.0, help="队伍在计分空间之间分布的偏斜程度，默认 0（均匀）")
+    parser.add_argument("--singletons", type=int, default=0, help="只有一支队伍的计分空间数量，默认 0")
+    parser.add_argument("--ties", type=float, default=0.0, help="制造同分的队伍比例，默认 0")
+    parser.add_argument("--seed", type=int, default=0, help="随机数种子，默认 0")
+    parser.add_argument("--min-std", type=float, default=5.0, help="最小标准差保护值，默认 5.0")
+    parser.add_argument("--repeat", type=int, default=3, help="每个阶段重复次数（取最短耗时），默认 3")
+    parser.add_argument("--skip-charts", action="store_true", help="不测量图表绘制")
+    parser.add_argument("--label", default="", help="本次运行的版本标签")
+    parser.add_argument("--output", default="bench_results.jsonl", help="结果记录文件，默认 bench_results.jsonl")
+    parser.add_argument("--compare", action="store_true", help="与上一次相同参数的运行结果对比")
+    parser.add_argument("--app", action="store_true", help="另外测量页面冷启动与热重跑耗时（需要安装 Streamlit）")
+    parser.add_argument("--app-reruns", type=int, default=5, help="热重跑次数（取最短耗时），默认 5")
+    parser.add_argument("--app-script", default=str(APP_SCRIPT), help="测量的页面脚本，可指向另一份代码树以对比修改前后，默认本目录的 main.py")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    params = {
+        "teams": args.teams, "stations": args.stations, "groups": args.groups, "skew": args.skew,
+        "singletons": args.singletons, "ties": args.ties, "seed": args.seed, "min_std": args.min_std,
+    }
+    team_data = generate_competition(
+        args.teams, args.stations, args.groups, args.skew, args.singletons, args.ties, args.seed,
+    )
+    phases = run_benchmark(team_data, args.min_std, args.repeat, [] if args.skip_charts else BENCH_CHARTS)
+    if args.app:
+        phases.update(measure_app(args.app_reruns, args.app_script))
+
+    record = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "label": args.label,
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "params": params,
+        "rows": len(team_data),
+        "phases": phases,
+    }
+    if args.app:
+        record["app_script"] = str(Path(args.app_script).resolve())
+
+    print(f"{'阶段':<28}{'耗时(s)':>12}{'内存峰值(MB)':>16}")
+    for name, phase in phases.items():
+        print(f"{name:<28}{phase['seconds']:>12.4f}{phase['peak_mb']:>16.2f}")
+
+    if args.compare:
+        previous = [r for r in load_records(args.output) if r["params"] == params]
+        if previous:
+            print_comparison(record, previous[-1])
+        else:
+            print("\n没有找到相同参数的历史记录", file=sys.stderr)
+
+    with open(args.output, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
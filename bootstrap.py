@@ -0,0 +1,139 @@
+"""
+最终成绩与排名的自助法（bootstrap）置信区间
+
+每次重抽样在每个计分空间内有放回地抽取与原队伍数相同的队伍，用抽样得到的平均分与标准差
+重新转换所有队伍的标准分并在组别内排名；重复多次后取各队伍最终成绩与组内排名的分位数。
+重抽样按批进行（批次数 × 队伍数 的矩阵运算），各批分发到进程池中并行计算，
+每批使用由同一种子派生的独立随机数流，相同种子与批大小得到相同结果。
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from scoring import SCORE_MAX, normalize_scores
+
+# 默认重抽样次数
+DEFAULT_REPLICATES = 1000
+# 每批重抽样次数，决定单个进程一次处理的矩阵大小（批大小 × 队伍数）
+BOOTSTRAP_CHUNK = 100
+# 默认随机数种子，保证申诉复核时结果可以复现
+DEFAULT_SEED = 0
+# 组别排名键中每个组别占用的区间宽度，须大于成绩的取值范围
+_GROUP_SPAN = 1000.0
+
+BOOTSTRAP_COLUMNS = [
+    "组别", "工位", "计分空间", "队伍名称", "最终成绩", "成绩下限", "成绩上限",
+    "组内排名", "排名下限", "排名中位数", "排名上限",
+]
+
+
+def _bootstrap_chunk(raw_scores, codes, group_codes, n_groups, min_std, replicates, seed):
+    """执行一批重抽样
+
+    参数:
+        raw_scores: 按计分空间编码排好序的原始平均分
+        codes: 与 raw_scores 对齐的计分空间编码（非递减）
+        group_codes: 与 raw_scores 对齐的组别编码
+        n_groups: 组别数量
+        min_std: 最小标准差保护值
+        replicates: 本批重抽样次数
+        seed: 本批使用的 SeedSequence
+
+    返回:
+        (scores, ranks)，均为 replicates × 队伍数 的矩阵（float32 / int32）
+    """
+    rng = np.random.default_rng(seed)
+    n_teams = len(raw_scores)
+    sizes = np.bincount(codes)
+    starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+
+    # 每个位置从所在计分空间中有放回地抽取一支队伍
+    picks = starts[codes] + (rng.random((replicates, n_teams)) * sizes[codes]).astype(np.int64)
+    # 以原计分空间平均分为偏移量累加，减少平方和相减时的精度损失
+    shift = np.bincount(codes, weights=raw_scores) / sizes
+    samples = raw_scores[picks] - shift[codes]
+    sums = np.add.reduceat(samples, starts, axis=1)
+    sq_sums = np.add.reduceat(samples * samples, starts, axis=1)
+
+    space_avg = shift + sums / sizes
+    space_var = np.zeros_like(sums)
+    multi = sizes > 1
+    space_var[:, multi] = np.maximum(sq_sums[:, multi] - sums[:, multi] ** 2 / sizes[multi], 0) / (sizes[multi] - 1)
+    scores = normalize_scores(raw_scores, space_avg[:, codes], np.sqrt(space_var)[:, codes], min_std)
+
+    # 组内排名（同分取最小名次）：把 重抽样序号、组别、成绩 编成一个有序键，整批只排序一次，
+    # 名次 = 键在排序结果中的位置 - 所在 (重抽样, 组别) 段的起始位置 + 1
+    row_base = np.arange(replicates)[:, None] * (n_groups * _GROUP_SPAN)
+    segment_base = row_base + group_codes * _GROUP_SPAN
+    keys = segment_base + (SCORE_MAX - scores)
+    sorted_keys = np.sort(keys, axis=None)
+    ranks = np.searchsorted(sorted_keys, keys, side="left") - np.searchsorted(sorted_keys, segment_base, side="left") + 1
+    return scores.astype(np.float32), ranks.astype(np.int32)
+
+
+def bootstrap_intervals(result_data, space_stats, min_std, replicates=DEFAULT_REPLICATES, level=0.95,
+                        seed=DEFAULT_SEED, jobs=None, chunk_size=BOOTSTRAP_CHUNK):
+    """计算每支队伍最终成绩与组内排名的置信区间
+
+    参数:
+        result_data: run_pipeline 返回的成绩表
+        space_stats: run_pipeline 返回的计分空间统计
+        min_std: 最小标准差保护值
+        replicates: 重抽样次数
+        level: 置信水平，例如 0.95 表示取 2.5% 与 97.5% 分位数
+        seed: 随机数种子，None 表示每次不同
+        jobs: 并行进程数，None 表示使用全部 CPU 核心，1 表示在当前进程中计算
+        chunk_size: 每批重抽样次数
+
+    返回:
+        逐队伍的 DataFrame，列见 BOOTSTRAP_COLUMNS，行顺序与 result_data 相同。
+    """
+    codes = pd.Index(space_stats["计分空间"]).get_indexer(result_data["计分空间"])
+    group_codes, group_labels = pd.factorize(result_data["组别"], use_na_sentinel=False)
+    order = np.argsort(codes, kind="stable")
+    # 计分空间编码重新映射为连续编码，保证每个编码都有队伍
+    _, dense_codes = np.unique(codes[order], return_inverse=True)
+
+    worker = partial(
+        _bootstrap_chunk,
+        result_data["原始平均分"].to_numpy(dtype=float)[order],
+        dense_codes,
+        group_codes[order],
+        len(group_labels),
+        min_std,
+    )
+    batches = [min(chunk_size, replicates - start) for start in range(0, replicates, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(batches))
+
+    if jobs == 1 or len(batches) == 1:
+        chunks = [worker(size, chunk_seed) for size, chunk_seed in zip(batches, seeds)]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            chunks = list(pool.map(worker, batches, seeds))
+
+    scores = np.concatenate([chunk[0] for chunk in chunks])
+    ranks = np.concatenate([chunk[1] for chunk in chunks])
+
+    # 分位数按排好序的位置计算，再还原到 result_data 的行顺序
+    tail = (1 - level) / 2 * 100
+    score_low, score_high = np.percentile(scores, [tail, 100 - tail], axis=0)
+    rank_low, rank_median, rank_high = np.percentile(ranks, [tail, 50, 100 - tail], axis=0)
+    restore = np.empty_like(order)
+    restore[order] = np.arange(len(order))
+
+    return pd.DataFrame({
+        "组别": result_data["组别"].to_numpy(),
+        "工位": result_data["工位"].to_numpy(),
+        "计分空间": result_data["计分空间"].to_numpy(),
+        "队伍名称": result_data["队伍名称"].to_numpy(),
+        "最终成绩": result_data["最终成绩"].to_numpy(),
+        "成绩下限": score_low[restore].round(1),
+        "成绩上限": score_high[restore].round(1),
+        "组内排名": result_data["组内排名"].to_numpy(),
+        "排名下限": np.floor(rank_low[restore]).astype(int),
+        "排名中位数": rank_median[restore],
+        "排名上限": np.ceil(rank_high[restore]).astype(int),
+    }, columns=BOOTSTRAP_COLUMNS)
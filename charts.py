@@ -0,0 +1,180 @@
+"""
+成绩分布分析图表
+
+每种图表对应一个绘图函数，输入计算结果 DataFrame，输出 PNG 图片内容。
+分布图的密度曲线由 density.py 在共享网格上一次估计（distribution_curves），可按结果版本缓存后
+传入 render_chart，各分布图直接用预先算好的曲线绘制。
+原始平均分与标准分关系的散点图为浏览器端交互图表，见 scatter.py。
+绘图直接使用 matplotlib.figure.Figure（不经过 pyplot 的全局图表注册表），
+图片写出后立即清理，不会在长时间运行的会话中累积图表对象。
+matplotlib 与 seaborn 导入较慢，只在第一次绘图时导入并设置中文字体，导入本模块不会加载它们。
+"""
+
+from functools import cache
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+from density import DENSITY_GRID, density_curves
+
+# 分布图与散点图中最多显示的计分空间数量（按队伍数量从多到少选取）
+MAX_KDE_SPACES = 10
+MAX_SCATTER_SPACES = 8
+# 导出图片的分辨率
+CHART_DPI = 100
+# 中文字体候选
+CHINESE_FONTS = ['SimHei', 'Microsoft YaHei', 'KaiTi', 'FangSong', 'STSong', 'Arial Unicode MS', 'sans-serif']
+
+
+@cache
+def configure_matplotlib():
+    """导入 matplotlib 并设置中文显示，每个进程只执行一次"""
+    import matplotlib
+
+    matplotlib.rcParams['font.sans-serif'] = CHINESE_FONTS
+    matplotlib.rcParams['axes.unicode_minus'] = False  # 解决负号显示问题
+    matplotlib.rcParams['font.family'] = 'sans-serif'
+
+
+def top_spaces(result_data, limit):
+    """返回队伍数量最多的若干个计分空间；数量未超过 limit 时按名称排序返回全部"""
+    counts = result_data["计分空间"].value_counts().sort_index()
+    # 分类列的 value_counts 会包含没有队伍的类别
+    counts = counts[counts > 0]
+    if len(counts) > limit:
+        return counts.sort_values(ascending=False, kind="stable").index[:limit].tolist()
+    return counts.index.tolist()
+
+
+def _kde_chart(ax, curves, xlabel, title, baseline=False):
+    """按分组绘制预先估计的核密度分布对比图；队伍过少的分组以地毯图标出每个分数"""
+    for curve in curves:
+        label = f"{curve.key} (平均: {curve.mean:.1f})"
+        if curve.density is not None:
+            line, = ax.plot(DENSITY_GRID, curve.density, label=label)
+            ax.fill_between(DENSITY_GRID, curve.density, color=line.get_color(), alpha=0.3)
+        else:
+            ax.plot(
+                curve.values, np.zeros(len(curve.values)), "|",
+                markersize=25, markeredgewidth=2, label=f"{label}，队伍过少",
+            )
+
+    # 横轴范围取所有分数两侧各留 10 分
+    scores = np.concatenate([curve.values for curve in curves]) if curves else np.array([])
+    if len(scores):
+        ax.set_xlim(max(DENSITY_GRID[0], scores.min() - 10), min(DENSITY_GRID[-1], scores.max() + 10))
+    ax.set_ylim(bottom=0)
+    ax.set_xlabel(xlabel, fontsize=12)
+    ax.set_ylabel("密度", fontsize=12)
+    ax.set_title(title, fontsize=14)
+    if baseline:
+        ax.axvline(70, color="red", linestyle="--", label="基准分: 70")
+    ax.grid(True, linestyle="--", alpha=0.3)
+    ax.legend()
+
+
+def _station_bar_chart(ax, result_data):
+    """各工位原始分柱状图，并在柱上标注数值"""
+    import seaborn as sns
+
+    sns.barplot(x="工位", y="原始平均分", data=result_data.sort_values("工位"), palette="Blues_d", ax=ax)
+    ax.set_title("各工位得分情况", fontsize=14)
+    ax.set_ylabel("原始分")
+    ax.set_ylim(0, 100)
+
+    # 在柱状图上标注数值
+    for p in ax.patches:
+        ax.annotate(
+            f"{p.get_height():.1f}",
+            (p.get_x() + p.get_width() / 2., p.get_height()),
+            ha='center',
+            va='bottom',
+            fontsize=10
+        )
+
+
+def _groups(result_data):
+    return sorted(result_data["组别"].unique())
+
+
+def _stations(result_data):
+    return sorted(result_data["工位"].unique())
+
+
+def _spaces(result_data):
+    return top_spaces(result_data, MAX_KDE_SPACES)
+
+
+# 分布图类型 -> (分组列, 分组取值函数, 取值列)
+DISTRIBUTIONS = {
+    "group_raw": ("组别", _groups, "原始平均分"),
+    "station_raw": ("工位", _stations, "原始平均分"),
+    "group_final": ("组别", _groups, "最终成绩"),
+    "station_final": ("工位", _stations, "最终成绩"),
+    "space_final": ("计分空间", _spaces, "最终成绩"),
+}
+
+
+def distribution_curves(result_data, chart_types=None):
+    """一次估计多张分布图的全部密度曲线
+
+    各图表的各分组编为连续的编码后合并，在共享网格上一次完成估计。
+    返回 {图表类型: [DensityCurve, ...]}，chart_types 默认为全部分布图。
+    """
+    chart_types = list(DISTRIBUTIONS) if chart_types is None else chart_types
+    values, codes, keys, owners = [], [], [], []
+    for chart_type in chart_types:
+        key_column, chart_keys, value_column = DISTRIBUTIONS[chart_type]
+        chart_keys = chart_keys(result_data)
+        key_codes = pd.Index(chart_keys).get_indexer(result_data[key_column])
+        chart_values = result_data[value_column].to_numpy(dtype=float)
+        selected = (key_codes >= 0) & ~np.isnan(chart_values)
+        values.append(chart_values[selected])
+        codes.append(key_codes[selected] + len(keys))
+        keys.extend(chart_keys)
+        owners.extend([chart_type] * len(chart_keys))
+
+    curves = {chart_type: [] for chart_type in chart_types}
+    if keys:
+        for owner, curve in zip(owners, density_curves(np.concatenate(values), np.concatenate(codes), keys)):
+            curves[owner].append(curve)
+    return curves
+
+
+# 图表类型 -> (标题, 画布尺寸, 绘图函数)；绘图函数的参数为 (ax, 成绩表, 分布曲线)
+CHARTS = {
+    "group_raw": ("各组原始平均分分布", (12, 6), lambda ax, df, curves: _kde_chart(
+        ax, curves["group_raw"], "原始平均分数", "各组分数分布对比")),
+    "station_raw": ("各工位原始平均分分布", (12, 6), lambda ax, df, curves: _kde_chart(
+        ax, curves["station_raw"], "原始平均分数", "各工位分数分布对比")),
+    "group_final": ("各组最终成绩分布", (12, 6), lambda ax, df, curves: _kde_chart(
+        ax, curves["group_final"], "最终成绩", "各组最终成绩分布对比", baseline=True)),
+    "station_final": ("各工位最终成绩分布", (12, 6), lambda ax, df, curves: _kde_chart(
+        ax, curves["station_final"], "最终成绩", "各工位最终成绩分布对比", baseline=True)),
+    "space_final": ("各计分空间最终成绩分布", (12, 6), lambda ax, df, curves: _kde_chart(
+        ax, curves["space_final"], "最终成绩", "各计分空间最终成绩分布对比", baseline=True)),
+    "station_bar": ("各工位得分情况", (10, 6), lambda ax, df, curves: _station_bar_chart(ax, df)),
+}
+
+
+def render_chart(chart_type, result_data, curves=None):
+    """绘制指定类型的图表并返回 PNG 图片内容，绘制完成后立即释放图表对象
+
+    curves 为 distribution_curves 的结果；未提供时只为本图表估计密度曲线。
+    """
+    configure_matplotlib()
+    from matplotlib.figure import Figure
+
+    _, figsize, draw = CHARTS[chart_type]
+    if curves is None and chart_type in DISTRIBUTIONS:
+        curves = distribution_curves(result_data, [chart_type])
+    fig = Figure(figsize=figsize)
+    try:
+        ax = fig.subplots()
+        draw(ax, result_data, curves)
+        buffer = BytesIO()
+        fig.savefig(buffer, format="png", dpi=CHART_DPI, bbox_inches="tight")
+        return buffer.getvalue()
+    finally:
+        fig.clear()
@@ -0,0 +1,141 @@
+"""
+命令行批处理入口：不启动 Streamlit 即可完成成绩计算并导出报表
+
+用法示例:
+    python cli.py 成绩.xlsx -o 输出目录
+    python cli.py 成绩目录/ --min-std 5.0 --format xlsx csv
+    python cli.py 成绩.csv --bootstrap 2000 --seed 42
+    python cli.py 成绩.xlsx --format report pdf
+    python cli.py 各赛道/ --jobs 8 --report
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+from batch import REPORT_FILE_NAME, run_batch, to_report_bytes
+from bootstrap import DEFAULT_SEED, bootstrap_intervals
+from exports import EXPORT_FORMATS
+from instrumentation import PhaseTimer, configure_logging, metrics_enabled_by_default
+from ingest import DEFAULT_TRIM, find_score_files
+from report import REPORT_FORMATS, report_parameters
+
+
+def warn(message):
+    """将提示信息输出到标准错误"""
+    print(f"[警告] {message}", file=sys.stderr)
+
+
+# 置信区间报告的文件名
+BOOTSTRAP_FILE_NAME = "成绩置信区间.csv"
+
+
+def export_content(fmt, track, min_std):
+    """生成一种导出格式的文件内容；完整报表与 PDF 公示附带各统计表与计算参数"""
+    if fmt in REPORT_FORMATS:
+        parameters = report_parameters(min_std, track.checksum, 赛道=track.track)
+        return REPORT_FORMATS[fmt][3](track.result_data, track.space_stats, track.total_stats, parameters)
+    return EXPORT_FORMATS[fmt][3](track.result_data)
+
+
+def export_track(path, track, output_dir, min_std, formats, timer=None, bootstrap=0, seed=DEFAULT_SEED):
+    """写出单个赛道的导出文件，返回写出的文件路径列表"""
+    timer = timer or PhaseTimer()
+    result_data, space_stats = track.result_data, track.space_stats
+    for message in track.warnings:
+        warn(f"{path.name}: {message}")
+
+    written = []
+    for fmt in formats:
+        _, file_name, _, _ = EXPORT_FORMATS.get(fmt) or REPORT_FORMATS[fmt]
+        out_path = output_dir / f"{path.stem}_{file_name}"
+        with timer.phase("export", rows=len(result_data), format=fmt):
+            out_path.write_bytes(export_content(fmt, track, min_std))
+        written.append(out_path)
+
+    if bootstrap:
+        out_path = output_dir / f"{path.stem}_{BOOTSTRAP_FILE_NAME}"
+        with timer.phase("bootstrap", rows=len(result_data), replicates=bootstrap):
+            intervals = bootstrap_intervals(result_data, space_stats, min_std, bootstrap, seed=seed)
+        out_path.write_bytes(intervals.to_csv(index=False).encode("utf-8"))
+        written.append(out_path)
+    return written
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="职业技能大赛成绩统计系统（命令行批处理）")
+    parser.add_argument("inputs", nargs="+", help="成绩文件（CSV/XLSX，队伍成绩表或逐评委长表）或包含成绩文件的目录")
+    parser.add_argument("-o", "--output-dir", default=".", help="导出文件所在目录，默认为当前目录")
+    parser.add_argument("--min-std", type=float, default=5.0, help="最小标准差保护值，默认 5.0")
+    parser.add_argument(
+        "--format", nargs="+", choices=sorted(EXPORT_FORMATS) + sorted(REPORT_FORMATS), default=["xlsx", "csv"],
+        dest="formats",
+        help="导出格式（xlsx/csv/parquet/arrow，report 为多工作表完整报表，pdf 为公示摘要），默认同时导出 xlsx 和 csv",
+    )
+    parser.add_argument(
+        "--trim", type=int, default=DEFAULT_TRIM,
+        help="逐评委成绩中每支队伍去掉的最高分、最低分个数，默认 1",
+    )
+    parser.add_argument(
+        "--bootstrap", type=int, default=0, metavar="N",
+        help="以 N 次重抽样计算最终成绩与组内排名的 95%% 置信区间，默认不计算",
+    )
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help=f"重抽样随机数种子，默认 {DEFAULT_SEED}")
+    parser.add_argument(
+        "--jobs", type=int, default=None,
+        help="同时计算的成绩文件（赛道）数量，默认使用全部 CPU 核心，1 表示依次计算",
+    )
+    parser.add_argument(
+        "--report", nargs="?", const=REPORT_FILE_NAME, default=None, metavar="FILE",
+        help=f"将所有赛道的结果合并写入一个多工作表 Excel 报表（默认文件名 {REPORT_FILE_NAME}）",
+    )
+    parser.add_argument(
+        "--metrics", action="store_true", default=metrics_enabled_by_default(),
+        help="将各阶段耗时以 JSON 行输出到标准错误（也可设置环境变量 SCORING_METRICS=1）",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    files = find_score_files(args.inputs)
+    if not files:
+        print("未找到任何成绩文件", file=sys.stderr)
+        return 1
+
+    if args.metrics:
+        configure_logging()
+    timer = PhaseTimer(enabled=args.metrics, context={"source": "cli"})
+
+    # 各赛道在独立进程中并行计算，按输入顺序依次写出导出文件
+    failed = 0
+    tracks = []
+    for path, outcome in run_batch(files, args.min_std, args.trim, args.jobs, timer):
+        try:
+            if isinstance(outcome, Exception):
+                raise outcome
+            written = export_track(
+                path, outcome, output_dir, args.min_std, args.formats, timer, args.bootstrap, args.seed,
+            )
+        except Exception as e:
+            # 计算或导出出错的文件不影响其他文件
+            print(f"[错误] {path}: 文件处理出错: {e}", file=sys.stderr)
+            failed += 1
+            continue
+        tracks.append(outcome)
+        for out_path in written:
+            print(out_path)
+
+    if args.report and tracks:
+        report_path = output_dir / args.report
+        with timer.phase("export", rows=sum(len(track.result_data) for track in tracks), format="report"):
+            report_path.write_bytes(to_report_bytes(tracks))
+        print(report_path)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+"""
+成绩报表导出
+
+Excel 使用 xlsxwriter 的 constant_memory 模式逐行写出，内存占用与行数无关；
+Parquet 与 Arrow IPC 为列式格式，供下游分析直接加载完整结果表。
+"""
+
+import re
+from io import BytesIO
+
+import xlsxwriter
+
+# 导出的字段顺序
+EXPORT_COLUMNS = ["组别", "工位", "队伍名称", "原始平均分", "最终成绩", "计分空间内排名", "组内排名", "奖项"]
+# Excel 逐块写出时每块的行数
+EXCEL_CHUNK_ROWS = 10_000
+# Excel 工作表名称的长度上限与不允许使用的字符
+SHEET_NAME_LIMIT = 31
+INVALID_SHEET_CHARS = re.compile(r"[\[\]:*?/\\]")
+
+
+def unique_sheet_names(names, reserved=(), default="Sheet"):
+    """把任意名称转换为合法且互不重复的 Excel 工作表名称（不与 reserved 中的名称重复）"""
+    used = set(reserved)
+    sheet_names = []
+    for name in names:
+        base = INVALID_SHEET_CHARS.sub("_", str(name))[:SHEET_NAME_LIMIT] or default
+        sheet_name, suffix = base, 1
+        while sheet_name in used:
+            suffix += 1
+            sheet_name = f"{base[:SHEET_NAME_LIMIT - len(str(suffix)) - 1]}_{suffix}"
+        used.add(sheet_name)
+        sheet_names.append(sheet_name)
+    return sheet_names
+
+
+def write_excel_sheet(workbook, sheet_name, frame):
+    """将 DataFrame 按行顺序写入新的工作表（constant_memory 模式要求逐行写出）"""
+    worksheet = workbook.add_worksheet(sheet_name)
+    worksheet.write_row(0, 0, [str(col) for col in frame.columns])
+    row_index = 1
+    for start in range(0, len(frame), EXCEL_CHUNK_ROWS):
+        # 每次只把一块数据转换为 Python 对象，缺失值写为空单元格
+        chunk = frame.iloc[start:start + EXCEL_CHUNK_ROWS].astype(object)
+        chunk = chunk.where(chunk.notna(), None)
+        for row in chunk.itertuples(index=False, name=None):
+            worksheet.write_row(row_index, 0, row)
+            row_index += 1
+    return worksheet
+
+
+def to_excel_bytes(result_data, sheet_name="成绩统计"):
+    """将成绩表导出为 Excel 文件内容"""
+    excel_buffer = BytesIO()
+    workbook = xlsxwriter.Workbook(excel_buffer, {"constant_memory": True})
+    write_excel_sheet(workbook, sheet_name, result_data[EXPORT_COLUMNS])
+    workbook.close()
+    return excel_buffer.getvalue()
+
+
+def to_csv_bytes(result_data):
+    """将成绩表导出为 UTF-8 编码的 CSV 文件内容"""
+    return result_data[EXPORT_COLUMNS].to_csv(index=False).encode("utf-8")
+
+
+def to_parquet_bytes(result_data):
+    """将完整结果表导出为 Parquet 文件内容"""
+    buffer = BytesIO()
+    result_data.reset_index(drop=True).to_parquet(buffer, index=False)
+    return buffer.getvalue()
+
+
+def to_arrow_bytes(result_data):
+    """将完整结果表导出为 Arrow IPC（Feather V2）文件内容"""
+    buffer = BytesIO()
+    result_data.reset_index(drop=True).to_feather(buffer)
+    return buffer.getvalue()
+
+
+# 导出格式 -> (按钮标签, 文件名, MIME 类型, 生成文件内容的函数)
+EXPORT_FORMATS = {
+    "xlsx": ("导出Excel报表", "技能大赛成绩统计.xlsx", "application/vnd.ms-excel", to_excel_bytes),
+    "csv": ("导出CSV数据", "技能大赛成绩.csv", "text/csv", to_csv_bytes),
+    "parquet": ("导出Parquet数据", "技能大赛成绩.parquet", "application/vnd.apache.parquet", to_parquet_bytes),
+    "arrow": ("导出Arrow数据", "技能大赛成绩.arrow", "application/vnd.apache.arrow.file", to_arrow_bytes),
+}
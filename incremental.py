@@ -0,0 +1,205 @@
+"""
+成绩修改后的增量重算
+
+逐个计分空间维护队伍数量、分数和与平方和的累计量。成绩录入表中只修改了部分队伍的
+原始分时，只更新这些队伍所在计分空间的统计量与标准分，只重排这些队伍所属的
+组别、工位、计分空间排名分区，只对所属组别重新评定奖项，并只在所属计分空间的行段内调整顺序，
+耗时与受影响分区的大小成正比；队伍增删、组别或工位变化时交由调用方全量重算。
+
+结果表按计分空间分段排列，增量更新只在段内调整顺序，因此结果表每一行所属的组别、工位与
+计分空间保持不变，这三列直接沿用，其余列以数组修改后组成新的结果表。
+"""
+
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from awards import DEFAULT_AWARD_RULE, allocate_awards
+from pipeline import compute_total_stats, team_row_hashes
+from ranking import RANK_DIMENSIONS, compute_ranks
+from scoring import normalize_scores
+
+# 一次增量更新中内容发生变化的结果表行位置与计分空间统计表行位置
+ScoreChanges = namedtuple("ScoreChanges", ["rows", "spaces"])
+
+
+def _partitions(values):
+    """把各行按取值分区，返回 (逐行分区编号, 各分区按升序排列的行位置列表)"""
+    codes, _ = pd.factorize(values, use_na_sentinel=False)
+    order = np.argsort(codes, kind="stable")
+    return codes, np.split(order, np.cumsum(np.bincount(codes))[:-1])
+
+
+class IncrementalScorer:
+    """在一次全量计算结果的基础上，对原始分修改进行增量更新
+
+    result_data 与 space_stats 为 run_pipeline 的结果，result_data 的行索引为队伍在 team_data 中的位置；
+    row_hashes 为 team_data 的逐行哈希，省略时重新计算。
+    """
+
+    def __init__(self, team_data, min_std, result_data, space_stats, row_hashes=None):
+        self.team_data = team_data
+        self.min_std = min_std
+        self.result_data = result_data
+        self.space_stats = space_stats
+        self.row_hashes = team_row_hashes(team_data) if row_hashes is None else row_hashes
+
+        # 结果表每一行对应的队伍位置，以及每支队伍在结果表中的行位置
+        n_rows = len(result_data)
+        self._teams = result_data.index.to_numpy()
+        self._rows = np.empty(n_rows, dtype=np.intp)
+        self._rows[self._teams] = np.arange(n_rows)
+
+        # 结果表每一行所属计分空间在 space_stats 中的位置，以及各计分空间在结果表中的行段 [起点, 终点)
+        self._codes = pd.Index(space_stats["计分空间"]).get_indexer(result_data["计分空间"])
+        starts = np.flatnonzero(np.r_[True, self._codes[1:] != self._codes[:-1]])
+        self._starts = np.zeros(len(space_stats), dtype=np.intp)
+        self._stops = np.zeros(len(space_stats), dtype=np.intp)
+        self._starts[self._codes[starts]] = starts
+        self._stops[self._codes[starts]] = np.r_[starts[1:], n_rows]
+
+        # 各排名维度与评奖分区的行位置，只在这些分区内重排与评奖
+        self._partitions = {
+            key: _partitions(result_data[key]) for key in {*RANK_DIMENSIONS.values(), DEFAULT_AWARD_RULE.scope}
+        }
+
+        # 以初始平均分为偏移量累计，减小平方和相减时的数值误差
+        n_spaces = len(space_stats)
+        self._shift = space_stats["平均分"].to_numpy(dtype=float).copy()
+        shifted = result_data["原始平均分"].to_numpy(dtype=float) - self._shift[self._codes]
+        self._counts = np.bincount(self._codes, minlength=n_spaces)
+        self._sums = np.bincount(self._codes, weights=shifted, minlength=n_spaces)
+        self._sq_sums = np.bincount(self._codes, weights=shifted * shifted, minlength=n_spaces)
+
+    @property
+    def total_stats(self):
+        return compute_total_stats(self.result_data)
+
+    def _space_moments(self):
+        """由累计量求出所有计分空间的平均分与样本标准差"""
+        counts = self._counts
+        space_avg = self._shift + self._sums / counts
+        space_std = np.zeros(len(counts))
+        multi = counts > 1
+        variance = (self._sq_sums[multi] - self._sums[multi] ** 2 / counts[multi]) / (counts[multi] - 1)
+        space_std[multi] = np.sqrt(np.maximum(variance, 0))
+        return space_avg, space_std
+
+    def _partition_rows(self, key, rows):
+        """rows 所在的 key 分区的全部行位置"""
+        codes, partitions = self._partitions[key]
+        return np.concatenate([partitions[code] for code in np.unique(codes[rows])])
+
+    def changed_teams(self, team_data):
+        """与上次的成绩表逐行比较，返回原始分被修改的队伍位置
+
+        队伍数量、列、队伍名称、组别、工位等原始分以外的取值有任何变化，或原始分不是有效数值时返回 None，
+        此时无法增量更新。
+        """
+        old = self.team_data
+        if len(team_data) != len(old) or not team_data.dtypes.equals(old.dtypes):
+            return None
+        for column in team_data.columns.drop("原始分"):
+            if not (team_data[column].to_numpy() == old[column].to_numpy()).all():
+                return None
+        new_raw = team_data["原始分"].to_numpy(dtype=float)
+        if not np.isfinite(new_raw).all():
+            return None
+        return np.flatnonzero(new_raw != old["原始分"].to_numpy(dtype=float))
+
+    def updated_row_hashes(self, team_data, changed):
+        """新成绩表的逐行哈希：只重算被修改的行"""
+        row_hashes = self.row_hashes.copy()
+        row_hashes[changed] = team_row_hashes(team_data.iloc[changed])
+        return row_hashes
+
+    def update(self, team_data, changed, row_hashes):
+        """按 changed_teams 找出的修改增量更新结果（最小标准差不变）
+
+        已发布的结果表与统计表保持不变，更新后的结果为新的 result_data 与 space_stats。
+        返回 ScoreChanges。
+        """
+        result = self.result_data
+        self.team_data = team_data
+        self.row_hashes = row_hashes
+        if not len(changed):
+            return ScoreChanges(np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp))
+
+        # 更新被修改队伍所在计分空间的累计量
+        rows = self._rows[changed]
+        codes = self._codes[rows]
+        new_raw = team_data["原始分"].to_numpy(dtype=float)[changed]
+        raw = result["原始平均分"].to_numpy(dtype=float).copy()
+        old_shifted = raw[rows] - self._shift[codes]
+        new_shifted = new_raw - self._shift[codes]
+        np.add.at(self._sums, codes, new_shifted - old_shifted)
+        np.add.at(self._sq_sums, codes, new_shifted ** 2 - old_shifted ** 2)
+        raw[rows] = new_raw
+
+        # 只重算受影响计分空间内队伍的标准分
+        spaces = np.unique(codes)
+        space_avg, space_std = self._space_moments()
+        block = np.concatenate([np.arange(self._starts[code], self._stops[code]) for code in spaces])
+        block_codes = self._codes[block]
+        final = result["最终成绩"].to_numpy(dtype=float).copy()
+        final[block] = normalize_scores(raw[block], space_avg[block_codes], space_std[block_codes], self.min_std)
+
+        # 更新受影响计分空间的统计信息
+        offsets = np.r_[0, np.cumsum(self._stops[spaces] - self._starts[spaces])[:-1]]
+        updates = {
+            "平均分": space_avg[spaces],
+            "标准差": space_std[spaces],
+            "最高分": np.maximum.reduceat(raw[block], offsets),
+            "最低分": np.minimum.reduceat(raw[block], offsets),
+        }
+        stats = {}
+        for column, values in updates.items():
+            stats[column] = self.space_stats[column].to_numpy(dtype=float).copy()
+            stats[column][spaces] = values
+        self.space_stats = self.space_stats.assign(**stats)
+
+        # 只重排受影响队伍所属的排名分区
+        columns = {
+            "队伍名称": result["队伍名称"].to_numpy().copy(),
+            "原始平均分": raw,
+            "最终成绩": final,
+        }
+        candidates = np.zeros(len(result), dtype=bool)
+        for rank_column, key in RANK_DIMENSIONS.items():
+            partition = self._partition_rows(key, rows)
+            ranked = pd.DataFrame({key: self._partitions[key][0][partition], "最终成绩": final[partition]})
+            columns[rank_column] = result[rank_column].to_numpy().copy()
+            columns[rank_column][partition] = compute_ranks(ranked, {rank_column: key})[rank_column].to_numpy()
+            candidates[partition] = True
+
+        # 只对受影响的评奖分区重新评定奖项
+        scope = DEFAULT_AWARD_RULE.scope
+        partition = self._partition_rows(scope, rows)
+        awarded = pd.DataFrame({scope: self._partitions[scope][0][partition], "最终成绩": final[partition]})
+        old_awards = result["奖项"].cat.codes.to_numpy()
+        columns["奖项"] = old_awards.copy()
+        columns["奖项"][partition] = allocate_awards(awarded).awards.cat.codes.to_numpy()
+        candidates[partition] = True
+
+        # 在受影响计分空间的行段内按计分空间内排名重新排列，同名次的队伍保持录入顺序，与全量计算一致
+        teams = self._teams.copy()
+        order = block[np.lexsort((teams[block], columns["计分空间内排名"][block], block_codes))]
+        for values in (*columns.values(), teams):
+            values[block] = values[order]
+        self._rows[teams[block]] = block
+
+        # 只有受影响分区内的行可能变化，逐列比较找出实际变化的行
+        candidates = np.flatnonzero(candidates)
+        modified = teams[candidates] != self._teams[candidates]
+        for column, values in columns.items():
+            before = old_awards if column == "奖项" else result[column].to_numpy()
+            modified |= values[candidates] != before[candidates]
+        self._teams = teams
+
+        columns["奖项"] = pd.Categorical.from_codes(columns["奖项"], dtype=result["奖项"].dtype)
+        self.result_data = pd.DataFrame(
+            {column: columns[column] if column in columns else result[column].array for column in result.columns},
+            index=pd.Index(teams),
+        )
+        return ScoreChanges(candidates[modified], spaces)
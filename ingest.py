@@ -0,0 +1,168 @@
+"""
+成绩文件读取与校验
+
+供 Streamlit 页面与命令行批处理共用，不依赖 Streamlit。
+"""
+
+import importlib.util
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from judges import CRITERION_COLUMN, aggregate_judge_scores, is_judge_format
+
+# 文件中必须包含的列
+REQUIRED_COLUMNS = ["组别", "工位", "队伍名称", "原始分"]
+# 文本列的解析类型
+COLUMN_DTYPES = {"组别": str, "工位": str, "队伍名称": str, "评委": str, CRITERION_COLUMN: str}
+# 分数列：原始分（队伍成绩表）与分数（逐评委长表）；由解析器识别为数值，
+# 含空白或非数值时保留原文，由 coerce_scores 统一转换并报告所在行
+SCORE_COLUMNS = ["原始分", "分数"]
+# 读取时保留的列：队伍成绩表的必要列，以及逐评委长表的列
+READ_COLUMNS = set(COLUMN_DTYPES) | set(SCORE_COLUMNS)
+# 逐评委成绩中每支队伍默认去掉的最高分、最低分个数
+DEFAULT_TRIM = 1
+# 分数无效时错误信息中最多列出的行数
+MAX_REPORTED_ROWS = 20
+# 有效的工位列表，包含 "工位1" 到 "工位7"
+VALID_STATIONS = [f"工位{i}" for i in range(1, 8)]
+# 支持的成绩文件扩展名
+SUPPORTED_SUFFIXES = (".csv", ".xlsx")
+
+
+class MissingColumnsError(ValueError):
+    """成绩文件缺少必要列"""
+
+    def __init__(self, missing):
+        self.missing = list(missing)
+        # 以缺少的列作为异常参数，跨进程传递（pickle）时按同一参数重建
+        super().__init__(self.missing)
+
+    def __str__(self):
+        return f"文件缺少必要列: {', '.join(self.missing)}"
+
+
+class InvalidScoresError(ValueError):
+    """分数缺失或不是数值"""
+
+    def __init__(self, column, rows, teams=None):
+        self.column = column
+        self.rows = list(rows)
+        self.teams = list(teams) if teams is not None else [None] * len(self.rows)
+        super().__init__(column, self.rows, self.teams)
+
+    def __str__(self):
+        listed = [
+            f"第 {row} 行" + (f"（{team}）" if team is not None else "")
+            for row, team in zip(self.rows[:MAX_REPORTED_ROWS], self.teams)
+        ]
+        more = f" 等共 {len(self.rows)} 行" if len(self.rows) > MAX_REPORTED_ROWS else ""
+        return f"{self.column}缺失或不是数值: {', '.join(listed)}{more}"
+
+
+def excel_engine():
+    """优先使用基于 Rust 的 calamine 引擎读取 Excel，未安装时回退到 pandas 默认引擎"""
+    return "calamine" if importlib.util.find_spec("python_calamine") else None
+
+
+def _check_columns(df):
+    """检查 DataFrame 是否包含队伍成绩表的所有必要列，或为完整的逐评委长表"""
+    if is_judge_format(df.columns):
+        return
+    missing = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    if missing:
+        raise MissingColumnsError(missing)
+
+
+def read_score_file(source, name=None):
+    """读取 CSV 或 Excel 成绩文件
+
+    只解析必要列（逐评委长表时为评委相关列），文本列按 COLUMN_DTYPES 指定类型，跳过 pandas 的类型推断；
+    分数列在 validate_team_data 中转换为浮点数。
+
+    参数:
+        source: 文件路径或类文件对象（如 Streamlit 上传的文件）
+        name: 文件名，用于判断格式；默认取 source 的名称
+
+    异常:
+        MissingColumnsError: 缺少必要列
+    """
+    name = str(name if name is not None else getattr(source, "name", source))
+    read_options = {"usecols": lambda col: col in READ_COLUMNS, "dtype": COLUMN_DTYPES}
+
+    # 判断文件是否为 CSV 格式，否则按 Excel 格式读取
+    if not name.lower().endswith(".csv"):
+        df = pd.read_excel(source, engine=excel_engine(), **read_options)
+    else:
+        df = pd.read_csv(source, **read_options)
+
+    _check_columns(df)
+    return df
+
+
+def coerce_scores(df):
+    """把分数列转换为浮点数，已是浮点数的列原样保留
+
+    异常:
+        InvalidScoresError: 分数缺失或无法转换为数值，行号从 1 开始
+    """
+    converted = {}
+    for column in SCORE_COLUMNS:
+        if column in df.columns:
+            values = pd.to_numeric(df[column], errors="coerce").astype("float64")
+            invalid = ~np.isfinite(values.to_numpy())
+            if invalid.any():
+                teams = df["队伍名称"].to_numpy()[invalid] if "队伍名称" in df.columns else None
+                raise InvalidScoresError(column, np.flatnonzero(invalid) + 1, teams)
+            converted[column] = values
+    return df.assign(**converted)
+
+
+def validate_team_data(df, trim=0):
+    """校验并清洗成绩数据
+
+    先把分数列转换为浮点数并拒绝缺失或非数值的分数，逐评委长表再汇总为每支队伍一个原始分
+    （去掉最高最低分各 trim 个后取平均）。在同一组向量化掩码上完成无效工位检查与重复队伍识别，
+    并据此一次性去重。
+
+    返回:
+        (team_data, warnings)：只含必要列、每个队伍只保留第一条记录的 DataFrame，
+        以及需要提示给用户的警告信息列表。
+
+    异常:
+        MissingColumnsError: 缺少必要列
+        InvalidScoresError: 分数缺失或不是数值
+    """
+    _check_columns(df)
+    df = coerce_scores(df)
+    warnings = []
+    if "原始分" not in df.columns:
+        df, judge_warnings = aggregate_judge_scores(df, trim)
+        warnings.extend(judge_warnings)
+    df = df[REQUIRED_COLUMNS]
+
+    # 检查 "工位" 列是否存在无效值
+    if not df["工位"].isin(VALID_STATIONS).all():
+        warnings.append("该文件包含无效的工位值，请检查并修正后重新上传。")
+
+    # 标记同一队伍名称的第二条及之后的记录
+    duplicated = df["队伍名称"].duplicated(keep="first").to_numpy()
+    if duplicated.any():
+        duplicate_teams = sorted(set(map(str, df["队伍名称"].to_numpy()[duplicated])))
+        warnings.append(f"以下队伍在多个工位出现: {', '.join(duplicate_teams)}。系统将只保留每个队伍的第一条记录。")
+        # 去除每个队伍的重复记录，只保留第一条记录
+        df = df[~duplicated]
+
+    return df.reset_index(drop=True), warnings
+
+
+def find_score_files(paths):
+    """展开输入路径：目录展开为其中的 CSV/XLSX 文件（按文件名排序），文件原样保留"""
+    files = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            files.extend(sorted(p for p in path.iterdir() if p.suffix.lower() in SUPPORTED_SUFFIXES))
+        else:
+            files.append(path)
+    return files
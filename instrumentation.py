@@ -0,0 +1,70 @@
+"""
+分阶段计时与结构化日志
+
+默认关闭，关闭时计时上下文不做任何记录。开启后记录每个阶段（读取、计算、排名、统计、
+导出、绘图）的耗时与处理行数，并以 JSON 行的形式写入 "scoring" 日志，便于日志采集系统解析。
+可通过环境变量 SCORING_METRICS=1、页面侧边栏的调试模式或命令行的 --metrics 开启。
+"""
+
+import json
+import logging
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+
+logger = logging.getLogger("scoring")
+
+# 开启计时的环境变量
+METRICS_ENV = "SCORING_METRICS"
+# 每个计时器保留的最近记录条数
+MAX_RECORDS = 100
+
+
+def metrics_enabled_by_default():
+    """环境变量 SCORING_METRICS 是否要求开启计时"""
+    return os.environ.get(METRICS_ENV, "").strip().lower() in ("1", "true", "yes", "on")
+
+
+def configure_logging():
+    """为 scoring 日志添加输出到标准错误的处理器，每条日志为一行 JSON（重复调用不会重复添加）"""
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+
+
+class PhaseTimer:
+    """分阶段计时器
+
+    参数:
+        enabled: 是否记录
+        context: 附加到每条日志中的字段，如 {"source": "cli"}
+    """
+
+    def __init__(self, enabled=False, context=None):
+        self.enabled = enabled
+        self.context = dict(context or {})
+        self.records = deque(maxlen=MAX_RECORDS)
+
+    @contextmanager
+    def phase(self, name, rows=None, **fields):
+        """计时上下文：记录 name 阶段的耗时与处理行数，fields 为附加的日志字段
+
+        上下文返回本条记录的字典，行数事先未知时可在阶段内写入 record["rows"]。
+        """
+        record = {"event": "phase", "phase": name, "rows": rows, **self.context, **fields}
+        if not self.enabled:
+            yield record
+            return
+
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["seconds"] = round(time.perf_counter() - start, 6)
+            record["ts"] = round(time.time(), 3)
+            self.records.append(record)
+            logger.info(json.dumps(record, ensure_ascii=False, default=str))
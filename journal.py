@@ -0,0 +1,127 @@
+"""
+成绩修改日志
+
+队伍成绩表的每次变化（上传文件、录入表格计算、接口提交）都以逐队伍的条目追加记录：
+新增或修改的队伍记为 "更新" 并带上修改后的组别、工位与原始分，被删除的队伍记为 "删除"。
+队伍以 队伍名称 与同名队伍中的出现序号（通常为 0）标识。只调整了队伍顺序的保存记一条 "重排"，
+新的顺序由同时保存的快照给出。
+
+回放时从某一时刻之前最近的快照出发，对其后的条目只取每支队伍的最后一条一次性合并，
+耗时与快照之后的修改条目数量成正比，而与赛事的全部修改历史无关。
+"""
+
+import numpy as np
+import pandas as pd
+
+from ingest import REQUIRED_COLUMNS
+
+# 条目的操作类型
+UPSERT = "更新"
+DELETE = "删除"
+REORDER = "重排"
+
+# 队伍标识与取值列
+KEY_COLUMNS = ["队伍名称", "序号"]
+VALUE_COLUMNS = ["组别", "工位", "原始分"]
+# 日志条目的字段顺序
+JOURNAL_COLUMNS = ["操作", "队伍名称", "序号", "组别", "工位", "原始分"]
+
+
+def _keyed(team_data):
+    """以 (队伍名称, 序号) 为索引的成绩表，取值统一为 组别/工位 对象列与浮点原始分"""
+    frame = pd.DataFrame({
+        "队伍名称": team_data["队伍名称"].astype(object).to_numpy(),
+        "组别": team_data["组别"].astype(object).to_numpy(),
+        "工位": team_data["工位"].astype(object).to_numpy(),
+        "原始分": pd.to_numeric(team_data["原始分"], errors="coerce").to_numpy(dtype=float),
+    })
+    frame["序号"] = frame.groupby("队伍名称", sort=False, dropna=False).cumcount()
+    return frame.set_index(KEY_COLUMNS)[VALUE_COLUMNS]
+
+
+def diff_teams(old, new):
+    """比较两张成绩表，返回把 old 变为 new 的日志条目（JOURNAL_COLUMNS）
+
+    更新条目按 new 中的顺序排列，删除条目的取值列为空。
+    """
+    old_keyed, new_keyed = _keyed(old), _keyed(new)
+    common = new_keyed.index[new_keyed.index.isin(old_keyed.index)]
+    before = old_keyed.loc[common]
+    after = new_keyed.loc[common]
+    same = ((before == after) | (before.isna() & after.isna())).all(axis=1).to_numpy()
+
+    upserted = ~new_keyed.index.isin(common[same])
+    deleted = ~old_keyed.index.isin(new_keyed.index)
+    entries = pd.concat([
+        new_keyed[upserted].assign(操作=UPSERT),
+        old_keyed[deleted].iloc[:, :0].assign(操作=DELETE),
+    ])
+    return entries.reset_index().reindex(columns=JOURNAL_COLUMNS)
+
+
+def upsert_entries(team_data, positions, occurrence):
+    """成绩表中 positions 位置的队伍原位修改后的日志条目（JOURNAL_COLUMNS），按位置顺序排列
+
+    occurrence 为这些队伍在同名队伍中的出现序号。
+    """
+    changed = team_data.iloc[positions]
+    entries = pd.DataFrame({
+        "操作": UPSERT,
+        "队伍名称": changed["队伍名称"].astype(object).to_numpy(),
+        "序号": np.asarray(occurrence, dtype="int64"),
+        "组别": changed["组别"].astype(object).to_numpy(),
+        "工位": changed["工位"].astype(object).to_numpy(),
+        "原始分": pd.to_numeric(changed["原始分"], errors="coerce").to_numpy(dtype=float),
+    })
+    return entries.reindex(columns=JOURNAL_COLUMNS)
+
+
+def apply_entries(base, entries):
+    """在成绩表 base 上按顺序应用日志条目，返回新的成绩表（REQUIRED_COLUMNS）
+
+    结果与逐条应用相同：一直存在的队伍保持原有位置，新增或删除后重新加入的队伍
+    按加入的先后追加在末尾。
+    """
+    keyed = _keyed(base)
+    # 重排标记不含队伍数据，新的顺序由快照给出
+    entries = entries[entries["操作"] != REORDER]
+    if entries.empty:
+        return keyed.reset_index()[REQUIRED_COLUMNS]
+
+    entries = entries.astype({"序号": "int64", "原始分": "float64"}).reset_index(drop=True)
+    position = pd.Series(np.arange(len(entries)))
+    is_upsert = (entries["操作"] == UPSERT).to_numpy()
+    # 每支队伍最后一次被删除的位置，没有删除过为 -1
+    last_delete = (
+        position.where(~is_upsert, -1)
+        .groupby([entries["队伍名称"], entries["序号"]], dropna=False)
+        .transform("max")
+    )
+    ever_deleted = pd.MultiIndex.from_frame(entries.loc[~is_upsert, KEY_COLUMNS])
+    latest = entries.drop_duplicates(KEY_COLUMNS, keep="last").set_index(KEY_COLUMNS)
+    upserts = latest[latest["操作"] == UPSERT]
+
+    # 没有删除过的队伍原位修改，删除过的队伍从原位置移除
+    in_place = keyed.index.isin(upserts.index) & ~keyed.index.isin(ever_deleted)
+    if in_place.any():
+        updated = upserts.loc[keyed.index[in_place]]
+        for column in VALUE_COLUMNS:
+            keyed.loc[in_place, column] = updated[column].to_numpy(dtype=keyed[column].dtype)
+    kept = keyed[~keyed.index.isin(ever_deleted)]
+
+    # 新增的队伍按最后一次加入的先后追加
+    joined = entries[is_upsert & (position > last_delete).to_numpy()].drop_duplicates(KEY_COLUMNS, keep="first")
+    order = pd.MultiIndex.from_frame(joined[KEY_COLUMNS])
+    added = order[order.isin(upserts.index) & ~order.isin(kept.index)]
+    result = pd.concat([kept, upserts.loc[added, VALUE_COLUMNS]])
+    return result.reset_index()[REQUIRED_COLUMNS]
+
+
+def reorder_marker():
+    """只调整了队伍顺序时记录的日志条目"""
+    return pd.DataFrame({"操作": [REORDER]}).reindex(columns=JOURNAL_COLUMNS)
+
+
+def same_order(left, right):
+    """两张成绩表的队伍及其排列顺序是否相同"""
+    return _keyed(left).index.equals(_keyed(right).index)
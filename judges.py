@@ -0,0 +1,66 @@
+"""
+多评委评分汇总
+
+接受逐评委、逐评分项的长表成绩（组别、工位、队伍名称、评委、评分项、分数），
+先把每位评委各评分项的分数相加得到该评委给出的总分，再对每支队伍的评委总分
+去掉最高分和最低分各 trim 个后取平均，作为队伍的原始分。全部为分组向量化运算。
+"""
+
+# 长表成绩必须包含的列（"评分项" 可选，缺省时每行即为该评委给出的总分）
+JUDGE_COLUMNS = ["组别", "工位", "队伍名称", "评委", "分数"]
+# 评分项列
+CRITERION_COLUMN = "评分项"
+# 确定一支队伍的列
+TEAM_KEYS = ["组别", "工位", "队伍名称"]
+
+
+def is_judge_format(columns):
+    """判断给定列是否为逐评委长表格式"""
+    return all(col in columns for col in JUDGE_COLUMNS)
+
+
+def aggregate_judge_scores(scores, trim=0):
+    """将逐评委成绩汇总为每支队伍一个原始分
+
+    参数:
+        scores: 包含 JUDGE_COLUMNS（可含 "评分项"）的长表 DataFrame
+        trim: 每支队伍去掉的最高分、最低分个数，例如 1 表示去掉一个最高分和一个最低分
+
+    返回:
+        (team_data, warnings)：包含 "组别"、"工位"、"队伍名称"、"原始分"、"评委人数" 列的 DataFrame
+        （队伍按首次出现顺序排列），以及评委人数不足、无法去掉最高最低分时的警告信息列表。
+    """
+    # 每位评委各评分项的分数相加，得到评委给出的总分
+    judge_totals = (
+        scores.groupby(TEAM_KEYS + ["评委"], sort=False, dropna=False)["分数"]
+        .sum(min_count=1)
+        .reset_index()
+    )
+    # 队伍按首次出现顺序编号，再按队伍、总分排序
+    judge_totals["队伍序号"] = judge_totals.groupby(TEAM_KEYS, sort=False, dropna=False).ngroup()
+    judge_totals = judge_totals.sort_values(["队伍序号", "分数"], kind="stable")
+
+    # 每支队伍内按总分从低到高的位置与评委人数
+    grouped = judge_totals.groupby("队伍序号", sort=True)
+    position = grouped.cumcount().to_numpy()
+    n_judges = grouped["分数"].transform("size").to_numpy()
+
+    # 评委人数不超过 2 * trim 时无法去掉最高最低分，保留全部评委的分数
+    can_trim = n_judges > 2 * trim
+    keep = ~can_trim | ((position >= trim) & (position < n_judges - trim))
+
+    team_data = (
+        judge_totals[keep]
+        .groupby("队伍序号", sort=True)
+        .agg(组别=("组别", "first"), 工位=("工位", "first"), 队伍名称=("队伍名称", "first"), 原始分=("分数", "mean"))
+    )
+    team_data["评委人数"] = grouped.size()
+    team_data = team_data.reset_index(drop=True)
+
+    warnings = []
+    short_teams = judge_totals.loc[~can_trim, "队伍名称"].unique()
+    if trim and len(short_teams):
+        warnings.append(
+            f"以下队伍评委人数不足 {2 * trim + 1} 人，未去掉最高分和最低分: {', '.join(map(str, short_teams))}"
+        )
+    return team_data, warnings
@@ -1,10 +1,31 @@
+import html
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
 import streamlit as st
 import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from io import BytesIO
-from tabulate import tabulate
+
+from awards import AWARD_SCOPES, DEFAULT_AWARD_QUOTAS, TIE_INCLUDE, TIE_POLICIES, AwardRule, allocate_awards
+from batch import REPORT_FILE_NAME, run_batch, to_report_bytes, track_summary
+from bootstrap import DEFAULT_REPLICATES, DEFAULT_SEED, bootstrap_intervals
+from charts import CHARTS, DISTRIBUTIONS, MAX_KDE_SPACES, MAX_SCATTER_SPACES, distribution_curves, render_chart
+from exports import EXPORT_FORMATS
+from instrumentation import PhaseTimer, configure_logging, metrics_enabled_by_default
+from ingest import (
+    DEFAULT_TRIM, REQUIRED_COLUMNS, InvalidScoresError, MissingColumnsError, coerce_scores, read_score_file,
+    validate_team_data,
+)
+from pipeline import (
+    MIN_STD_RANGE, MIN_TEAMS, compute_group_stats, result_min_std, run_pipeline, single_team_warnings,
+    team_data_checksum,
+)
+from report import REPORT_FORMATS, report_parameters
+from scatter import SCATTER_CHARTS, scatter_chart, scatter_data
+from sensitivity import sweep_min_std
+from shared import EventRegistry
+from store import DEFAULT_EVENT, CompetitionStore
 
 # ------------------------------------------ 页面配置 ----------------------------------------- #
 
@@ -16,123 +37,35 @@ st.set_page_config(
     initial_sidebar_state="expanded",
 )
 
-# 设置中文显示
-plt.rcParams['font.sans-serif'] = ['SimHei', 'Microsoft YaHei', 'KaiTi', 'FangSong', 'STSong', 'Arial Unicode MS', 'sans-serif']
-plt.rcParams['axes.unicode_minus'] = False  # 解决负号显示问题
-plt.rcParams['font.family'] = 'sans-serif'
-
-# 自定义 CSS 样式，根据不同的图标设置不同的背景颜色
-custom_css = """\
-<style>
-    .header {
-        text-align: center;
-        font-size: 2.5rem;
-        color: #1a3d7c;
-        padding: 1rem;
-        background: linear-gradient(135deg, #f5f7fa 0%, #e4edf9 100%);
-        border-radius: 10px;
-        box-shadow: 0 4px 6px rgba(0,0,0,0.1);
-        margin-bottom: 2rem;
-    }
-    .section {
-        background-color: #ffffff;
-        border-radius: 10px;
-        padding: 1.5rem;
-        box-shadow: 0 2px 4px rgba(0,0,0,0.05);
-        margin-bottom: 1.5rem;
-    }
-    .metric-card {
-        background: #f8f9fa;
-        border-left: 4px solid #1a3d7c;
-        padding: 1rem;
-        border-radius: 5px;
-    }
-    .stButton>button {
-        background-color: #1a3d7c;
-        color: white;
-        border-radius: 5px;
-        padding: 0.5rem 1rem;
-        transition: all 0.3s;
-    }
-    .stButton>button:hover {
-        background-color: #0d2b5c;
-        transform: translateY(-2px);
-        box-shadow: 0 4px 8px rgba(0,0,0,0.1);
-    }
-    .stDownloadButton>button {
-        background-color: #1a3d7c;
-        color: white;
-        border-radius: 5px;
-        padding: 0.5rem 1rem;
-        transition: all 0.3s;
-    }
-    .stDownloadButton>button:hover {
-        background-color: #0d2b5c;
-        transform: translateY(-2px);
-        box-shadow: 0 4px 8px rgba(0,0,0,0.1);
-    }
-    .footer {
-        text-align: center;
-        padding: 1rem;
-        color: #6c757d;
-        font-size: 0.9rem;
-    }
-    
-    /* 调整文件上传区域的大小 */
-    .css-1cpxqw2[data-testid="stFileUploader"] {
-        width: 100%;
-        padding: 0.5rem;
-    }
-    
-    /* 调整上传文件的按钮大小 */
-    button[data-testid="stFileUploaderUploadButton"] {
-        font-size: 0.8rem !important;
-        padding: 0.2rem 0.5rem !important;
-        height: auto !important;
-    }
-    
-    /* 调整拖放区域的高度 */
-    .css-1cpxqw2[data-testid="stFileUploader"] > div:first-child {
-        min-height: 80px !important;
-    }
-    
-    /* 修改按钮文字为中文 */
-    button[data-testid="stFileUploaderUploadButton"]::before {
-        content: "浏览文件";
-        visibility: visible;
-        display: block;
-    }
-    
-    button[data-testid="stFileUploaderUploadButton"] span {
-        visibility: hidden;
-        position: relative;
-    }
-    
-    button[data-testid="stFileUploaderUploadButton"] span::after {
-        visibility: visible;
-        position: absolute;
-        top: 0;
-        left: 0;
-        content: "";
-    }
-</style>\
-"""
+# 静态资源（样式表、logo）所在目录，与运行平台无关
+ASSET_DIR = Path(__file__).resolve().parent
+
+
+@st.cache_resource
+def load_css():
+    """自定义 CSS 样式，每个进程只读取一次"""
+    return f"<style>\n{(ASSET_DIR / 'style.css').read_text(encoding='utf-8')}</style>"
+
+
+@st.cache_resource
+def load_logo():
+    """学校 logo 图片内容，每个进程只读取一次"""
+    return (ASSET_DIR / "school.png").read_bytes()
+
+
 # 注入自定义 CSS 样式
-st.markdown(custom_css, unsafe_allow_html=True)
+st.markdown(load_css(), unsafe_allow_html=True)
 
 # ------------------------------------------ Logo 标题 ----------------------------------------- #
 
 # 添加学校 logo 居中显示
-school_logo = ".\\school.png"
 col1, col2 = st.columns([2, 15])
 with col2:
-    st.image(school_logo, width=800)
+    st.image(load_logo(), width=800)
 
-# 页面标题
-st.markdown(
-    '<div class="header">2025年世界职业院校技能大赛广东赛区<br>"人工智能赛道" 遴选赛成绩计分系统</div>',
-    unsafe_allow_html=True,
-)
+# 页面标题，赛道名称在侧边栏中设置后填入
+DEFAULT_TRACK = "人工智能赛道"
+page_title = st.empty()
 
 # ------------------------------------------ 侧边栏 -------------------------------------------- #
 
@@ -140,15 +73,24 @@ st.markdown(
 with st.sidebar:
     # 在侧边栏中显示一个标题为 "系统设置" 的标题
     st.header("系统设置")
+    # 赛事编号：同一赛事的所有用户共享同一份成绩数据与计算结果，可通过链接参数 ?event= 指定
+    event_id = st.text_input(
+        "赛事编号",
+        value=st.query_params.get("event", DEFAULT_EVENT),
+        help="同一赛事编号的所有用户共享成绩数据与计算结果",
+    ).strip() or DEFAULT_EVENT
+    st.query_params["event"] = event_id
+    # 赛道名称：显示在页面标题中
+    track_name = st.text_input("赛道名称", value=DEFAULT_TRACK).strip() or DEFAULT_TRACK
     # 创建一个滑动条组件，让用户可以调整最小标准差保护值
     # min_std 对 st.slider 的返回值进行了类型注释，指定其类型为 float
     min_std = st.slider(
         # 滑动条的标签，显示在滑动条上方
         "最小标准差保护值",
         # 滑动条的最小值
-        1.0,
+        MIN_STD_RANGE[0],
         # 滑动条的最大值
-        20.0,
+        MIN_STD_RANGE[1],
         # 滑动条的初始值
         5.0,
         # 滑动条每次调整的步长
@@ -156,9 +98,27 @@ with st.sidebar:
         # 鼠标悬停在滑动条上时显示的帮助信息
         help="防止小组标准差过小导致分数异常波动",
     )
+    # 逐评委长表上传时，每支队伍去掉的最高分、最低分个数
+    st.number_input(
+        "去掉最高分/最低分个数",
+        min_value=0,
+        max_value=3,
+        value=DEFAULT_TRIM,
+        step=1,
+        key="judge_trim",
+        help="上传逐评委成绩（含'评委'、'分数'列）时，每支队伍先去掉相应个数的最高分和最低分，再取平均作为原始分",
+    )
     # 创建一个复选框组件，用户可以选择是否显示分数分布图
     # 初始状态为选中（True）
     show_dist = st.checkbox("显示分数分布图", True)
+    # 调试模式：记录各阶段耗时与行数，并输出 JSON 格式的日志
+    debug_mode = st.checkbox(
+        "调试模式",
+        metrics_enabled_by_default(),
+        help="记录读取、计算、排名、统计、导出、绘图各阶段的耗时，并以 JSON 行输出到服务器日志",
+    )
+    # 性能调试面板，内容在页面末尾填充
+    debug_panel = st.empty()
     # 在侧边栏中添加一条分隔线，用于区分不同内容区域
     st.divider()
     # 使用 Markdown 语法在侧边栏中显示加粗的 "使用说明" 文本
@@ -168,139 +128,272 @@ with st.sidebar:
     # 在侧边栏中再添加一条分隔线
     st.divider()
 
+page_title.markdown(
+    f'<div class="header">2025年世界职业院校技能大赛广东赛区<br>"{html.escape(track_name)}" 遴选赛成绩计分系统</div>',
+    unsafe_allow_html=True,
+)
+
+# ------------------------------------------ 性能计时 ------------------------------------------ #
+
+# 每个会话一个计时器，调试模式关闭时不做任何记录
+if "timer" not in st.session_state:
+    st.session_state.timer = PhaseTimer(context={"source": "app"})
+st.session_state.timer.enabled = debug_mode
+if debug_mode:
+    configure_logging()
+timer = st.session_state.timer
+
+# ------------------------------------------ 共享赛事数据 -------------------------------------- #
+
+# 更新检查间隔：其他用户更新成绩或结果后，本页面在该间隔内自动刷新
+UPDATE_CHECK_INTERVAL = "5s"
+
+
+@st.cache_resource
+def get_store():
+    """所有会话共享的本地赛事数据库"""
+    return CompetitionStore()
+
+
+@st.cache_resource
+def get_registry():
+    """所有会话共享的赛事数据集，数据持久化在本地赛事数据库中"""
+    return EventRegistry(get_store())
+
+
+shared_event = get_registry().get(event_id)
+
 # ------------------------------------------ 成绩录入 ------------------------------------------ #
 
-# 初始化 session_state.team_data 为 DataFrame，用于存储队伍数据
-st.session_state.team_data = pd.DataFrame(columns=["组别", "工位", "队伍名称", "原始分"])
+# 会话首次运行时初始化
+if "editor_version" not in st.session_state:
+    st.session_state.editor_version = 0
+    st.session_state.pending_toasts = []
 
-# 将多个 Streamlit 组件组合起来，这些组件会按顺序垂直排列在容器内
-with st.container():
-    st.markdown("### 参赛队伍成绩录入")
-    col1, col2 = st.columns([3, 1])
-    
-    with col1:
-        # 手动输入表格
-        edited_df = st.data_editor(
-            st.session_state.team_data,
-            num_rows="dynamic",
-            use_container_width=True,
-            hide_index=True,  # 隐藏索引列
-            column_config={
-                "组别": st.column_config.SelectboxColumn(
-                    "组别",
-                    options=["高职(专科)", "高职(本科)", "高中", "中职", "普通本科"],
-                    required=True,
-                    width="medium"
-                ),
-                "工位": st.column_config.SelectboxColumn(
-                    "工位",
-                    options=["工位1", "工位2", "工位3", "工位4", "工位5", "工位6", "工位7"],
-                    required=True,
-                    width="small"
-                ),
-                "队伍名称": st.column_config.TextColumn(
-                    "队伍名称", width="medium", required=True
-                ),
-                "原始分": st.column_config.NumberColumn(
-                    "原始分",
-                    min_value=0,
-                    max_value=100,
-                    step=0.1,
-                    format="%.1f",
-                    required=True,
-                    width="small"
-                ),
-            },
-            key="team_data_editor",  # 添加唯一键以保持状态一致
-        )
-        # 更新 session_state 中的数据
-        st.session_state.team_data = edited_df.reset_index(drop=True)  # 重置索引并丢弃原索引
-        
-        print('\n\n')
-        print(tabulate(st.session_state.team_data, headers="keys", tablefmt="pretty"))
-        print('最小标准差:', min_std)
+st.session_state.event_id = event_id
+st.session_state.seen_version = shared_event.version
 
-    with col2:
-        # 文件上传功能，将文件上传组件放置在 col2 列中
-        uploaded_file = st.file_uploader(
-            # 文件上传组件的标签，显示在组件上方
-            "上传成绩文件",
-            # 允许上传的文件类型，支持 Excel 和 CSV 格式
-            type=["xlsx", "csv"],
-            # 鼠标悬停在组件上时显示的帮助信息，提示文件格式和必要列
-            help="支持Excel或CSV格式，需包含'组别'、'工位'、'队伍名称'和'原始分'列",
-        )
-        # 检查用户是否上传了文件
-        if uploaded_file:
-            try:
-                # 判断上传文件是否为 CSV 格式
-                if uploaded_file.name.endswith(".csv"):
-                    # 若为 CSV 格式，使用 pandas 的 read_csv 函数读取文件
-                    df = pd.read_csv(uploaded_file)
-                else:
-                    # 若为非 CSV 格式（即 Excel 格式），使用 pandas 的 read_excel 函数读取文件
-                    df = pd.read_excel(uploaded_file)
-
-                # 定义文件中必须包含的列名
-                required_columns = ["组别", "工位", "队伍名称", "原始分"]
-                
-                # 检查 DataFrame 的列是否包含所有必要列
-                if all(col in df.columns for col in required_columns):
-                    # 若包含所有必要列，从 DataFrame 中提取这些列并复制一份
-                    df = df[required_columns].copy()
-                    
-                    # 生成有效的工位列表，包含 "工位1" 到 "工位7"
-                    valid_stations = [f"工位{i}" for i in range(1, 8)]
-                    # 检查 DataFrame 中的 "工位" 列是否存在无效值
-                    if not df["工位"].isin(valid_stations).all():
-                        # 找出所有无效的工位值
-                        invalid_stations = df[~df["工位"].isin(valid_stations)]["工位"].unique()
-                        # 使用 Streamlit 显示警告信息，提示用户存在无效的工位值
-                        st.toast("该文件包含无效的工位值，请检查并修正后重新上传。", icon="⚠️")
-                    
-                    # 按队伍名称分组，统计每个队伍出现的工位数
-                    team_counts = df.groupby("队伍名称")["工位"].count()
-                    # 找出在多个工位出现的队伍名称
-                    duplicate_teams = team_counts[team_counts > 1].index.tolist()
-                    
-                    # 若存在在多个工位出现的队伍
-                    if duplicate_teams:
-                        # 使用 Streamlit 显示警告信息，提示用户哪些队伍在多个工位出现，并说明处理方式
-                        st.toast(f"以下队伍在多个工位出现: {', '.join(duplicate_teams)}。系统将只保留每个队伍的第一条记录。", icon="⚠️")
-                        # 去除每个队伍的重复记录，只保留第一条记录
-                        df = df.drop_duplicates(subset=["队伍名称"], keep="first")
-                    
-                    # 将处理后的 DataFrame 存入 session_state 中
-                    st.session_state.team_data = df.reset_index(drop=True)  # 重置索引并丢弃原索引
-                    st.toast(f"成功导入 {len(df)} 条记录", icon="✅")
-
-                    print("文件上传更新后的数据：")
-                    print(tabulate(st.session_state.team_data, headers="keys", tablefmt="pretty"))
-                else:
-                    # 找出文件中缺失的必要列
-                    missing_cols = [col for col in required_columns if col not in df.columns]
-                    st.toast(f"文件缺少必要列: {', '.join(missing_cols)}", icon="⚠️")
-            except Exception as e:
-                # 若在文件处理过程中出现异常，使用 Streamlit 显示错误信息，提示用户具体的错误内容
-                st.toast(f"文件处理出错: {e}", icon="❌")
+# 直接引用共享的计算结果，不在会话中复制
+if shared_event.result is not None:
+    (
+        st.session_state.result_data,
+        st.session_state.space_stats,
+        st.session_state.total_stats,
+        st.session_state.result_key,
+    ) = shared_event.result
+else:
+    for key in ("result_data", "space_stats", "total_stats", "result_key"):
+        st.session_state.pop(key, None)
+
+
+@st.fragment(run_every=UPDATE_CHECK_INTERVAL)
+def watch_event_updates():
+    """定期比较共享数据集的版本号，其他用户更新后刷新整个页面"""
+    event = get_registry().get(st.session_state.event_id)
+    if event.version != st.session_state.seen_version:
+        st.session_state.pending_toasts.append(("赛事成绩数据已更新", "🔄"))
+        st.rerun()
+
+
+watch_event_updates()
+
+
+def on_file_upload():
+    """上传文件变化时只读取并校验一次，结果作为录入表格的新基础数据"""
+    uploaded_file = st.session_state.score_file_uploader
+    if uploaded_file is None:
+        return
+    try:
+        # 读取并校验上传文件（检查必要列、无效工位值与重复队伍）
+        with st.session_state.timer.phase("ingest", file=uploaded_file.name) as record:
+            df, warnings = validate_team_data(read_score_file(uploaded_file), st.session_state.judge_trim)
+            record["rows"] = len(df)
+    except (MissingColumnsError, InvalidScoresError) as e:
+        st.session_state.pending_toasts.append((str(e), "⚠️"))
+        return
+    except Exception as e:
+        # 若在文件处理过程中出现异常，提示用户具体的错误内容
+        st.session_state.pending_toasts.append((f"文件处理出错: {e}", "❌"))
+        return
+
+    st.session_state.pending_toasts.extend((message, "⚠️") for message in warnings)
+    # 发布为赛事的共享成绩表，本页面与其他用户的录入表格随后都会刷新
+    get_registry().get(st.session_state.event_id).publish_teams(df)
+    st.session_state.pending_toasts.append((f"成功导入 {len(df)} 条记录", "✅"))
+
+
+def sync_editor_data(event):
+    """切换赛事或共享成绩表被替换（上传文件、其他用户计算）时，用共享成绩表作为录入表格的基础数据，
+    并更换表格的 key 以丢弃基于旧数据的编辑记录"""
+    teams_version = event.version[0]
+    if st.session_state.get("editor_event_id") != event.event or st.session_state.get("seen_teams_version") != teams_version:
+        shared_teams = event.team_data
+        st.session_state.editor_data = shared_teams if shared_teams is not None else pd.DataFrame(columns=REQUIRED_COLUMNS)
+        st.session_state.editor_version += 1
+        st.session_state.seen_teams_version = teams_version
+        st.session_state.editor_event_id = event.event
+        # 本页面引起的成绩表更新无需再由定时检查触发整页刷新
+        st.session_state.seen_version = (teams_version, st.session_state.seen_version[1])
+
+
+@st.fragment
+def input_section():
+    """成绩录入区：编辑表格或上传文件时只重跑这一区域"""
+    sync_editor_data(shared_event)
+
+    # 显示上传回调中产生的提示信息
+    while st.session_state.pending_toasts:
+        message, icon = st.session_state.pending_toasts.pop(0)
+        st.toast(message, icon=icon)
+
+    # 将多个 Streamlit 组件组合起来，这些组件会按顺序垂直排列在容器内
+    with st.container():
+        st.markdown("### 参赛队伍成绩录入")
+        col1, col2 = st.columns([3, 1])
+
+        with col1:
+            # 手动输入表格
+            edited_df = st.data_editor(
+                st.session_state.editor_data,
+                num_rows="dynamic",
+                use_container_width=True,
+                hide_index=True,  # 隐藏索引列
+                column_config={
+                    "组别": st.column_config.SelectboxColumn(
+                        "组别",
+                        options=["高职(专科)", "高职(本科)", "高中", "中职", "普通本科"],
+                        required=True,
+                        width="medium"
+                    ),
+                    "工位": st.column_config.SelectboxColumn(
+                        "工位",
+                        options=["工位1", "工位2", "工位3", "工位4", "工位5", "工位6", "工位7"],
+                        required=True,
+                        width="small"
+                    ),
+                    "队伍名称": st.column_config.TextColumn(
+                        "队伍名称", width="medium", required=True
+                    ),
+                    "原始分": st.column_config.NumberColumn(
+                        "原始分",
+                        min_value=0,
+                        max_value=100,
+                        step=0.1,
+                        format="%.1f",
+                        required=True,
+                        width="small"
+                    ),
+                },
+                key=f"team_data_editor_{st.session_state.editor_version}",  # 添加唯一键以保持状态一致
+            )
+            # 更新 session_state 中的数据
+            st.session_state.team_data = edited_df.reset_index(drop=True)  # 重置索引并丢弃原索引
+
+        with col2:
+            # 文件上传功能，将文件上传组件放置在 col2 列中
+            st.file_uploader(
+                # 文件上传组件的标签，显示在组件上方
+                "上传成绩文件",
+                # 允许上传的文件类型，支持 Excel 和 CSV 格式
+                type=["xlsx", "csv"],
+                # 鼠标悬停在组件上时显示的帮助信息，提示文件格式和必要列
+                help="支持Excel或CSV格式，需包含'组别'、'工位'、'队伍名称'和'原始分'列；"
+                     "也可上传逐评委成绩，包含'组别'、'工位'、'队伍名称'、'评委'、'评分项'（可选）和'分数'列",
+                # 文件变化时在回调中处理，避免每次页面重跑都重新读取文件
+                on_change=on_file_upload,
+                key="score_file_uploader",
+            )
+
+
+input_section()
 
 # ------------------------------------------ 成绩计算 ------------------------------------------ #
 
-def normalize_score(raw_score, group_avg, group_std, min_std):
-    """标准分转换公式，带安全处理"""
-    print('最小标准差:', min_std)
-    # 如果标准差过小或为零，使用最小标准差值
-    if group_std < min_std or np.isclose(group_std, 0):
-        effective_std = min_std
-    else:
-        effective_std = group_std
-    
-    # 如果只有一个分数，返回70分(基准分)
-    if np.isclose(group_std, 0):
-        return 70.0
-        
-    score = 70 + 10 * (raw_score - group_avg) / effective_std
-    return max(0, min(100, score))  # 限制在0-100区间
+# 导出文件缓存的最大条目数
+EXPORT_CACHE_ENTRIES = 16
+
+
+@st.cache_data(max_entries=EXPORT_CACHE_ENTRIES, show_spinner="正在生成导出文件...")
+def cached_export(result_key, export_format, _result_data):
+    """按结果版本与导出格式缓存导出文件内容"""
+    return EXPORT_FORMATS[export_format][3](_result_data)
+
+
+@st.cache_data(max_entries=EXPORT_CACHE_ENTRIES, show_spinner="正在生成报表...")
+def cached_report(result_key, report_format, track, _result_data, _space_stats, _total_stats, _parameters):
+    """按结果版本、报表格式与赛道名称缓存完整报表（Excel）或公示摘要（PDF）"""
+    return REPORT_FORMATS[report_format][3](_result_data, _space_stats, _total_stats, _parameters)
+
+
+@st.cache_data(max_entries=EXPORT_CACHE_ENTRIES, show_spinner=False)
+def report_checksum(result_key, _result_data):
+    """按结果版本缓存计算所用成绩表的校验码；成绩表取自计算结果本身，与数据库中当前保存的版本无关"""
+    return team_data_checksum(_result_data.rename(columns={"原始平均分": "原始分"}))
+
+
+# 图表图片缓存的最大条目数
+CHART_CACHE_ENTRIES = 64
+# 同时绘制图表的上限，可通过环境变量 SCORING_CHART_SLOTS 指定，避免多人同时查看时绘图占满服务器资源
+CHART_SLOTS_ENV = "SCORING_CHART_SLOTS"
+DEFAULT_CHART_SLOTS = 2
+
+
+@st.cache_resource
+def chart_render_slots():
+    """所有会话共享的绘图并发限制，进程内只有一个；已绘制过的图表直接从缓存读取，不占用名额"""
+    return threading.BoundedSemaphore(max(1, int(os.environ.get(CHART_SLOTS_ENV) or DEFAULT_CHART_SLOTS)))
+
+
+# 分布曲线缓存的最大条目数（每个结果版本一条）
+CURVE_CACHE_ENTRIES = 8
+
+
+@st.cache_data(max_entries=CURVE_CACHE_ENTRIES, show_spinner="正在估计分数分布...")
+def cached_distribution_curves(result_key, _result_data):
+    """按结果版本缓存所有分布图的密度曲线，五张分布图共用一次估计"""
+    return distribution_curves(_result_data)
+
+
+@st.cache_data(max_entries=CHART_CACHE_ENTRIES, show_spinner="正在绘制图表...")
+def cached_chart(result_key, chart_type, _result_data, _slots):
+    """按结果版本与图表类型缓存图表图片，仅在未命中缓存时占用绘图名额"""
+    curves = cached_distribution_curves(result_key, _result_data) if chart_type in DISTRIBUTIONS else None
+    with _slots:
+        return render_chart(chart_type, _result_data, curves)
+
+
+@st.cache_data(max_entries=CHART_CACHE_ENTRIES)
+def cached_scatter_data(result_key, chart_type, _result_data):
+    """按结果版本与图表类型缓存交互式散点图的数据"""
+    return scatter_data(chart_type, _result_data)
+
+
+# 图表类型 -> 标题：分布图与柱状图为服务端绘制的图片，散点图为浏览器端交互图表
+CHART_TITLES = {
+    **{chart_type: spec[0] for chart_type, spec in CHARTS.items()},
+    **{chart_type: spec[0] for chart_type, spec in SCATTER_CHARTS.items()},
+}
+
+
+# 敏感性分析缓存的最大条目数
+SWEEP_CACHE_ENTRIES = 16
+
+
+@st.cache_data(max_entries=SWEEP_CACHE_ENTRIES, show_spinner="正在进行敏感性分析...")
+def cached_sweep(result_key, grid, _result_data, _space_stats):
+    """按结果版本与最小标准差取值缓存敏感性分析报告"""
+    return sweep_min_std(_result_data, _space_stats, np.array(grid)).report
+
+
+# 置信区间缓存的最大条目数
+BOOTSTRAP_CACHE_ENTRIES = 4
+
+
+@st.cache_data(max_entries=BOOTSTRAP_CACHE_ENTRIES, show_spinner="正在进行重抽样分析...")
+def cached_bootstrap(result_key, replicates, seed, _result_data, _space_stats):
+    """按结果版本、重抽样次数与随机数种子缓存置信区间"""
+    return bootstrap_intervals(_result_data, _space_stats, result_min_std(result_key), replicates, seed=seed)
+
 
 with st.container():
     col1, col2 = st.columns([3, 1])
@@ -309,544 +402,394 @@ with st.container():
 
     # 计算逻辑
     if calculate_btn:
-        if len(st.session_state.team_data) < 2:
-            st.toast("至少需要2支队伍才能进行计算！", icon="❌")
+        if len(st.session_state.team_data) < MIN_TEAMS:
+            st.toast(f"至少需要{MIN_TEAMS}支队伍才能进行计算！", icon="❌")
+            st.stop()
+        # 录入表格中新增的行可能尚未填写原始分，与上传文件使用同一检查
+        try:
+            st.session_state.team_data = coerce_scores(st.session_state.team_data)
+        except InvalidScoresError as e:
+            st.toast(str(e), icon="❌")
             st.stop()
 
-        # 创建一个原始数据的副本进行计算
-        raw_data = st.session_state.team_data.copy()
-        
-        # 重命名原始分为原始平均分（因为每队只有一个工位，所以原始分就是原始平均分）
-        raw_data = raw_data.rename(columns={"原始分": "原始平均分"})
-        
-        # 以队伍为单位进行计算
-        st.session_state.result_data = raw_data.copy()
-        
-        # 创建"工位+组别"的联合计分空间
-        raw_data['计分空间'] = raw_data['工位'] + '-' + raw_data['组别']
-        st.session_state.result_data['计分空间'] = st.session_state.result_data['工位'] + '-' + st.session_state.result_data['组别']
-        
-        # 初始化结果存储
-        st.session_state.space_stats = {}
-        # 获取所有计分空间
-        all_spaces = st.session_state.result_data["计分空间"].unique()
-        
-        for space in all_spaces:
-            # 获取当前计分空间的数据
-            space_df = st.session_state.result_data[st.session_state.result_data["计分空间"] == space]
-            
-            # 从计分空间名称中提取工位和组别信息
-            space_parts = space.split('-')
-            station = space_parts[0]
-            group = space_parts[1] if len(space_parts) > 1 else "未知组别"
-            
-            # 检查计分空间内队伍数量
-            if len(space_df) <= 1:
-                # 计算统计指标
-                raw_scores = space_df["原始平均分"].values
-                space_avg = np.mean(raw_scores)
-                
-                # 如果计分空间内只有一支队伍，设置标准分为70分(基准分)
-                st.session_state.space_stats[space] = {
-                    "工位": station,
-                    "组别": group,
-                    "队伍数量": len(space_df),
-                    "平均分": space_avg,
-                    "标准差": 0.0,
-                    "最高分": raw_scores[0] if len(raw_scores) > 0 else 0,
-                    "最低分": raw_scores[0] if len(raw_scores) > 0 else 0,
-                }
-                
-                # 应用固定分数
-                mask = st.session_state.result_data["计分空间"] == space
-                st.session_state.result_data.loc[mask, "最终成绩"] = 70.0
-                
-                # 添加警告信息
-                st.toast(f"警告: '{space}' (工位: {station}, 组别: {group}) 内只有一支队伍，无法进行标准分转换，已设置为基准分70分。", icon="⚠️")
-            else:
-                # 计算统计指标
-                raw_scores = space_df["原始平均分"].values
-                space_avg = np.mean(raw_scores)
-                space_std = np.std(raw_scores, ddof=1)  # 样本标准差
-                
-                # 存储计分空间统计信息
-                st.session_state.space_stats[space] = {
-                    "工位": station,
-                    "组别": group,
-                    "队伍数量": len(space_df),
-                    "平均分": space_avg,
-                    "标准差": space_std,
-                    "最高分": np.max(raw_scores) if len(raw_scores) > 0 else 0,
-                    "最低分": np.min(raw_scores) if len(raw_scores) > 0 else 0,
-                }
-                
-                # 应用标准分转换
-                mask = st.session_state.result_data["计分空间"] == space
-                st.session_state.result_data.loc[mask, "最终成绩"] = (
-                    space_df["原始平均分"]
-                    .apply(lambda x: normalize_score(x, space_avg, space_std, min_std))
-                    .round(1)
-                    .values
-                )
-        
-        # 在各个维度单独排名
-        st.session_state.result_data["组内排名"] = 0
-        st.session_state.result_data["工位内排名"] = 0
-        st.session_state.result_data["计分空间内排名"] = 0
-        
-        # 首先按组别排名
-        all_groups = st.session_state.result_data["组别"].unique()
-        for group in all_groups:
-            # 获取当前组的索引
-            group_idx = st.session_state.result_data[st.session_state.result_data["组别"] == group].index
-            
-            # 在组内排名
-            st.session_state.result_data.loc[group_idx, "组内排名"] = (
-                st.session_state.result_data.loc[group_idx, "最终成绩"]
-                .rank(ascending=False, method="min")
-                .astype(int)
-                .values
-            )
-        
-        # 然后按工位排名
-        all_stations = st.session_state.result_data["工位"].unique()
-        for station in all_stations:
-            # 获取当前工位的索引
-            station_idx = st.session_state.result_data[st.session_state.result_data["工位"] == station].index
-            
-            # 在工位内排名
-            st.session_state.result_data.loc[station_idx, "工位内排名"] = (
-                st.session_state.result_data.loc[station_idx, "最终成绩"]
-                .rank(ascending=False, method="min")
-                .astype(int)
-                .values
-            )
-        
-        # 最后按计分空间排名
-        for space in all_spaces:
-            # 获取当前计分空间的索引
-            space_idx = st.session_state.result_data[st.session_state.result_data["计分空间"] == space].index
-            
-            # 在计分空间内排名
-            st.session_state.result_data.loc[space_idx, "计分空间内排名"] = (
-                st.session_state.result_data.loc[space_idx, "最终成绩"]
-                .rank(ascending=False, method="min")
-                .astype(int)
-                .values
+        # 计分空间标准分转换、多维度排名与总体统计：同一赛事的结果只计算一次并共享给所有会话，
+        # 相同数据与参数直接复用，只修改了部分队伍的原始分时增量更新
+        (
+            st.session_state.result_data,
+            st.session_state.space_stats,
+            st.session_state.total_stats,
+            st.session_state.result_key,
+        ) = shared_event.compute(st.session_state.team_data, min_std, timer)
+
+        # 本页面的录入数据即为最新的共享成绩表，下次运行时以其作为表格基础数据
+        st.session_state.editor_data = st.session_state.team_data
+        st.session_state.editor_version += 1
+        st.session_state.seen_teams_version, _ = shared_event.version
+        st.session_state.seen_version = shared_event.version
+
+        # 计分空间内只有一支队伍时，无法进行标准分转换，已设置为基准分70分
+        for message in single_team_warnings(st.session_state.space_stats):
+            st.toast(message, icon="⚠️")
+
+
+@st.fragment
+def chart_panel(chart_type):
+    """单张图表，图片按结果版本与图表类型缓存"""
+    st.markdown(f"#### {CHART_TITLES[chart_type]}")
+    if chart_type == "space_final" and st.session_state.result_data["计分空间"].nunique() > MAX_KDE_SPACES:
+        st.toast(f"计分空间数量过多，为了可视化效果，仅显示队伍数量最多的{MAX_KDE_SPACES}个计分空间", icon="⚠️")
+    if chart_type == "space_scatter" and st.session_state.result_data["计分空间"].nunique() > MAX_SCATTER_SPACES:
+        st.toast(f"计分空间数量过多，为了可视化效果，仅显示队伍数量最多的{MAX_SCATTER_SPACES}个计分空间", icon="⚠️")
+
+    if chart_type in SCATTER_CHARTS:
+        with timer.phase("plots", rows=len(st.session_state.result_data), chart=chart_type):
+            data = cached_scatter_data(st.session_state.result_key, chart_type, st.session_state.result_data)
+        st.altair_chart(scatter_chart(chart_type, data), use_container_width=True)
+        return
+
+    try:
+        with timer.phase("plots", rows=len(st.session_state.result_data), chart=chart_type):
+            chart_image = cached_chart(
+                st.session_state.result_key,
+                chart_type,
+                st.session_state.result_data,
+                chart_render_slots(),
             )
-        
-        # 排序：先按计分空间，再按计分空间内排名
-        st.session_state.result_data = st.session_state.result_data.sort_values(
-            by=["计分空间", "计分空间内排名"]
-        )
-        
-        # 计算总体统计数据
-        total_raw_scores = st.session_state.result_data["原始平均分"].values
-        st.session_state.total_stats = {
-            "队伍数量": len(st.session_state.result_data),
-            "平均分": np.mean(total_raw_scores),
-            "标准差": np.std(total_raw_scores, ddof=1),
-            "最高分": np.max(total_raw_scores),
-            "最低分": np.min(total_raw_scores),
-        }
-
-    # 显示结果
-    if "result_data" in st.session_state and "最终成绩" in st.session_state.result_data.columns:
-        st.divider()
-
-        # 总体统计指标卡片
-        st.markdown("### 总体统计概览")
-        cols = st.columns(4)
-        total_stats = st.session_state.total_stats
-        cols[0].metric("参赛队伍", f"{total_stats['队伍数量']}支")
-        cols[1].metric("总平均分", f"{total_stats['平均分']:.1f}")
-        cols[2].metric("总标准差", f"{total_stats['标准差']:.1f}")
-        cols[3].metric("分数范围", f"{total_stats['最低分']:.1f}-{total_stats['最高分']:.1f}")
-
-        # 分组统计
-        st.markdown("### 组别统计")
-        # 获取所有组别
-        all_groups = sorted(st.session_state.result_data["组别"].unique())
-        group_cols = st.columns(len(all_groups))
-        
-        for i, group in enumerate(all_groups):
-            with group_cols[i]:
-                st.markdown(f"#### {group}")
-                group_df = st.session_state.result_data[st.session_state.result_data["组别"] == group]
-                team_count = len(group_df)
-                avg_score = group_df["原始平均分"].mean()
-                std_score = group_df["原始平均分"].std(ddof=1) if len(group_df) > 1 else 0.0
-                min_score = group_df["原始平均分"].min() if not group_df.empty else 0.0
-                max_score = group_df["原始平均分"].max() if not group_df.empty else 0.0
-                
-                st.metric("队伍数量", f"{team_count}支")
-                st.metric("平均分", f"{avg_score:.1f}")
-                st.metric("标准差", f"{std_score:.1f}")
-                st.metric("分数范围", f"{min_score:.1f}-{max_score:.1f}")
-
-        # 计分空间统计
-        st.markdown("### 计分空间统计")
-        
-        # 创建一个DataFrame来展示计分空间统计
-        space_stats_df = pd.DataFrame([
-            {
-                "计分空间": space,
-                "工位": stats["工位"],
-                "组别": stats["组别"],
-                "队伍数量": stats["队伍数量"],
-                "平均分": f"{stats['平均分']:.1f}",
-                "标准差": f"{stats['标准差']:.1f}",
-                "最高分": stats["最高分"],
-                "最低分": stats["最低分"]
-            }
-            for space, stats in st.session_state.space_stats.items()
-        ]).sort_values(by=["工位", "组别"])
-        
-        st.dataframe(space_stats_df, use_container_width=True, hide_index=True)
-
-        # 成绩表格
-        st.markdown("### 最终成绩排名")
-        display_columns = ["计分空间", "计分空间内排名", "组别", "组内排名", "工位", "工位内排名", "队伍名称", "原始平均分", "最终成绩"]
-        
+        st.image(chart_image)
+    except Exception as e:
+        st.toast(f"绘图时发生错误: {str(e)}", icon="❌")
+        return
+
+    if chart_type == "station_bar":
+        # 显示工位详细信息
+        st.markdown("#### 工位详细信息")
+        station_info = st.session_state.result_data[["工位", "队伍名称", "组别", "原始平均分"]].sort_values(by="工位")
         st.dataframe(
-            st.session_state.result_data[display_columns],
+            station_info,
             use_container_width=True,
             hide_index=True
         )
 
-        # 导出按钮
+
+@st.fragment
+def charts_section():
+    """可视化：只绘制用户选中的图表，切换图表时只重跑图表区"""
+    st.markdown("### 成绩分布分析")
+
+    selected_charts = st.pills(
+        "选择要查看的图表",
+        options=list(CHART_TITLES),
+        format_func=lambda chart_type: CHART_TITLES[chart_type],
+        selection_mode="multi",
+        default=[next(iter(CHARTS))],
+    )
+
+    for chart_type in selected_charts:
+        chart_panel(chart_type)
+
+
+# 成绩排名表的展示列
+DISPLAY_COLUMNS = [
+    "计分空间", "计分空间内排名", "组别", "组内排名", "工位", "工位内排名", "队伍名称", "原始平均分", "最终成绩", "奖项",
+]
+# 获奖名单的字段顺序
+AWARD_LIST_COLUMNS = ["组别", "工位", "计分空间", "队伍名称", "原始平均分", "最终成绩", "组内排名"]
+
+
+@st.fragment
+def results_section():
+    """结果展示区：切换导出格式、分析参数时只重跑这一区域"""
+    st.divider()
+
+    # 总体统计指标卡片
+    st.markdown("### 总体统计概览")
+    cols = st.columns(4)
+    total_stats = st.session_state.total_stats
+    cols[0].metric("参赛队伍", f"{total_stats['队伍数量']}支")
+    cols[1].metric("总平均分", f"{total_stats['平均分']:.1f}")
+    cols[2].metric("总标准差", f"{total_stats['标准差']:.1f}")
+    cols[3].metric("分数范围", f"{total_stats['最低分']:.1f}-{total_stats['最高分']:.1f}")
+
+    # 分组统计
+    st.markdown("### 组别统计")
+    # 所有组别的统计在一次分组聚合中完成
+    group_stats = compute_group_stats(st.session_state.result_data)
+    group_cols = st.columns(len(group_stats))
+
+    for col, row in zip(group_cols, group_stats.itertuples(index=False, name=None)):
+        group, team_count, avg_score, std_score, max_score, min_score = row
+        with col:
+            st.markdown(f"#### {group}")
+            st.metric("队伍数量", f"{team_count}支")
+            st.metric("平均分", f"{avg_score:.1f}")
+            st.metric("标准差", f"{std_score:.1f}")
+            st.metric("分数范围", f"{min_score:.1f}-{max_score:.1f}")
+
+    # 计分空间统计
+    st.markdown("### 计分空间统计")
+
+    # 格式化计分空间统计用于展示
+    space_stats_df = st.session_state.space_stats.assign(
+        平均分=st.session_state.space_stats["平均分"].map("{:.1f}".format),
+        标准差=st.session_state.space_stats["标准差"].map("{:.1f}".format),
+    ).sort_values(by=["工位", "组别"])
+
+    st.dataframe(space_stats_df, use_container_width=True, hide_index=True)
+
+    # 成绩表格
+    st.markdown("### 最终成绩排名")
+    st.dataframe(
+        st.session_state.result_data[DISPLAY_COLUMNS],
+        use_container_width=True,
+        hide_index=True
+    )
+
+    # 奖项评定：按各分区的获奖比例与同分处理方式重新评定，比例或成绩修改后即时更新
+    with st.expander("奖项评定"):
+        default_rule = "、".join(f"{award} {ratio:.0%}" for award, ratio in DEFAULT_AWARD_QUOTAS.items())
+        st.caption(f"成绩表与导出文件中的奖项按组别评定（{default_rule}，{TIE_INCLUDE}）；可在下方按组别或计分空间调整比例")
         col1, col2 = st.columns(2)
         with col1:
-            # Excel导出
-            excel_buffer = BytesIO()
-            with pd.ExcelWriter(excel_buffer, engine="xlsxwriter") as writer:
-                # 调整导出的字段顺序：按照指定顺序排列
-                export_columns = ["组别", "工位", "队伍名称", "原始平均分", "最终成绩", "计分空间内排名", "组内排名"]
-                st.session_state.result_data[export_columns].to_excel(
-                    writer, index=False, sheet_name="成绩统计"
+            scope = st.segmented_control("评奖分区", AWARD_SCOPES, default=AWARD_SCOPES[0], key="award_scope")
+        with col2:
+            tie_policy = st.segmented_control("名次线同分", TIE_POLICIES, default=TIE_INCLUDE, key="award_tie_policy")
+        scope, tie_policy = scope or AWARD_SCOPES[0], tie_policy or TIE_INCLUDE
+
+        # 各分区的获奖比例（%），默认均为默认比例
+        partitions = sorted(st.session_state.result_data[scope].dropna().unique())
+        quota_table = st.data_editor(
+            pd.DataFrame(
+                {award: [ratio * 100] * len(partitions) for award, ratio in DEFAULT_AWARD_QUOTAS.items()},
+                index=pd.Index(partitions, name=scope),
+            ),
+            column_config={
+                award: st.column_config.NumberColumn(f"{award}(%)", min_value=0, max_value=100, step=1, format="%.0f")
+                for award in DEFAULT_AWARD_QUOTAS
+            },
+            use_container_width=True,
+            key=f"award_quotas_{scope}",
+        )
+        rule = AwardRule(scope, DEFAULT_AWARD_QUOTAS, tie_policy, {
+            key: {award: ratios[award] / 100 for award in DEFAULT_AWARD_QUOTAS}
+            for key, ratios in quota_table.fillna(0).iterrows()
+        })
+        with timer.phase("awards", rows=len(st.session_state.result_data), scope=scope):
+            awards, cutoffs = allocate_awards(st.session_state.result_data, rule)
+        st.dataframe(cutoffs, use_container_width=True, hide_index=True)
+
+        award_list = (
+            st.session_state.result_data[AWARD_LIST_COLUMNS]
+            .assign(奖项=awards)
+            .sort_values([scope, "奖项", "最终成绩"], ascending=[True, True, False], kind="stable")
+        )
+        st.download_button(
+            label="导出获奖名单",
+            data=award_list.to_csv(index=False).encode("utf-8"),
+            file_name="获奖名单.csv",
+            mime="text/csv",
+            on_click="ignore",
+        )
+
+    # 最小标准差敏感性分析：一次计算整组取值下的成绩与组内排名，找出奖项会随取值变化的队伍
+    with st.expander("最小标准差敏感性分析"):
+        sweep_range = st.slider("最小标准差取值范围", *MIN_STD_RANGE, MIN_STD_RANGE, 0.5)
+        grid = tuple(np.arange(sweep_range[0], sweep_range[1] + 0.25, 0.5).round(1))
+        with timer.phase("sweep", rows=len(st.session_state.result_data), grid=len(grid)):
+            sweep_report = cached_sweep(
+                st.session_state.result_key, grid, st.session_state.result_data, st.session_state.space_stats,
+            )
+        changed = int(sweep_report["奖项变化"].sum())
+        st.caption(
+            f"共 {len(grid)} 个取值；组内获奖比例："
+            f"{'、'.join(f'{award} {ratio:.0%}' for award, ratio in DEFAULT_AWARD_QUOTAS.items())}；"
+            f"奖项会随取值变化的队伍 {changed} 支"
+        )
+        st.dataframe(sweep_report, use_container_width=True, hide_index=True)
+
+    # 自助法置信区间：在计分空间内重抽样队伍，评估小计分空间带来的成绩与排名不确定性
+    with st.expander("成绩与排名置信区间（自助法）"):
+        col1, col2 = st.columns(2)
+        replicates = col1.number_input("重抽样次数", min_value=100, max_value=10000, value=DEFAULT_REPLICATES, step=100)
+        seed = col2.number_input("随机数种子", min_value=0, value=DEFAULT_SEED, step=1, help="相同种子得到相同结果，便于复核")
+        if st.button("开始分析", key="run_bootstrap"):
+            with timer.phase("bootstrap", rows=len(st.session_state.result_data), replicates=replicates):
+                interval_report = cached_bootstrap(
+                    st.session_state.result_key,
+                    int(replicates),
+                    int(seed),
+                    st.session_state.result_data,
+                    st.session_state.space_stats,
                 )
-            excel_data = excel_buffer.getvalue()
+            st.caption("成绩与排名区间为 95% 置信区间（2.5% 与 97.5% 分位数），排名为组内排名")
+            st.dataframe(interval_report, use_container_width=True, hide_index=True)
+
+    # 导出：选择格式后才生成文件内容，同一结果版本的导出文件直接复用缓存
+    col1, col2 = st.columns(2)
+    with col1:
+        export_format = st.segmented_control(
+            "导出格式",
+            options=list(EXPORT_FORMATS) + list(REPORT_FORMATS),
+            format_func=lambda fmt: {**EXPORT_FORMATS, **REPORT_FORMATS}[fmt][0],
+            label_visibility="collapsed",
+        )
+
+    with col2:
+        if export_format in REPORT_FORMATS:
+            # 完整报表与公示摘要包含各统计表与计算参数
+            label, file_name, mime, _ = REPORT_FORMATS[export_format]
+            key = st.session_state.result_key
+            parameters = report_parameters(
+                result_min_std(key), report_checksum(key, st.session_state.result_data), 赛事=event_id, 赛道=track_name,
+            )
+            with timer.phase("export", rows=len(st.session_state.result_data), format=export_format):
+                export_data = cached_report(
+                    key,
+                    export_format,
+                    track_name,
+                    st.session_state.result_data,
+                    st.session_state.space_stats,
+                    st.session_state.total_stats,
+                    parameters,
+                )
+        elif export_format:
+            label, file_name, mime, _ = EXPORT_FORMATS[export_format]
+            with timer.phase("export", rows=len(st.session_state.result_data), format=export_format):
+                export_data = cached_export(st.session_state.result_key, export_format, st.session_state.result_data)
+        if export_format:
             st.download_button(
-                label="导出Excel报表",
-                data=excel_data,
-                file_name="技能大赛成绩统计.xlsx",
-                mime="application/vnd.ms-excel",
+                label=label,
+                data=export_data,
+                file_name=file_name,
+                mime=mime,
                 use_container_width=True,  # 使按钮填充整个列宽
             )
 
-        with col2:
-            # CSV导出
-            # 调整导出的字段顺序：按照指定顺序排列
-            export_columns = ["组别", "工位", "队伍名称", "原始平均分", "最终成绩", "计分空间内排名", "组内排名"]
-            csv_data = st.session_state.result_data[export_columns].to_csv(index=False).encode("utf-8")
-            st.download_button(
-                label="导出CSV数据",
-                data=csv_data,
-                file_name="技能大赛成绩.csv",
-                mime="text/csv",
-                use_container_width=True,  # 使按钮填充整个列宽
+
+# 显示结果
+if "result_data" in st.session_state and "最终成绩" in st.session_state.result_data.columns:
+    results_section()
+    if show_dist:
+        charts_section()
+
+# ------------------------------------------ 修改记录与回放 ------------------------------------- #
+
+# 回放结果缓存的最大条目数
+REPLAY_CACHE_ENTRIES = 8
+# 修改记录缓存的最大条目数
+HISTORY_CACHE_ENTRIES = 8
+
+
+@st.cache_data(max_entries=HISTORY_CACHE_ENTRIES, show_spinner=False)
+def cached_history(event, revision):
+    """按赛事数据版本号缓存修改记录：版本号不变时日志没有新条目，定时刷新引起的重跑不再汇总整个日志"""
+    return get_store().history(event)
+
+
+@st.cache_data(max_entries=REPLAY_CACHE_ENTRIES, show_spinner="正在回放成绩记录...")
+def cached_replay(event, at, fallback_min_std):
+    """重建某一时刻的成绩表并按当时生效的最小标准差重新计算
+
+    修改日志只增不改，同一赛事同一时刻的回放结果不会变化，按 (赛事, 时刻) 缓存。
+    返回 (成绩表, 计算结果或 None, 使用的最小标准差)；当时还没有计算过时使用 fallback_min_std。
+    """
+    store = get_store()
+    team_data = store.replay_teams(event, at)
+    calculation = store.calculation_at(event, at)
+    replay_min_std = calculation[0] if calculation is not None else fallback_min_std
+    if team_data is None or len(team_data) < MIN_TEAMS:
+        return team_data, None, replay_min_std
+    result_data, _, _ = run_pipeline(team_data, replay_min_std)
+    return team_data, result_data, replay_min_std
+
+
+@st.fragment
+def history_section():
+    """修改记录与历史回放：按修改日志重建任意一次保存后的成绩表与最终成绩，供申诉复核"""
+    with st.expander("修改记录与历史回放"):
+        history = cached_history(event_id, get_store().event_revision(event_id))
+        if history.empty:
+            st.caption("暂无修改记录")
+            return
+        st.dataframe(history, use_container_width=True, hide_index=True)
+
+        at = st.selectbox(
+            "回放到", options=history["记录时间"].iloc[::-1].tolist(), help="重建该次保存后的成绩表与最终成绩",
+        )
+        if st.button("开始回放", key="run_replay"):
+            with timer.phase("replay", at=at) as record:
+                team_data, result_data, replay_min_std = cached_replay(event_id, at, min_std)
+                record["rows"] = 0 if team_data is None else len(team_data)
+            if result_data is None:
+                st.toast(f"该时刻的队伍少于{MIN_TEAMS}支，无法计算成绩", icon="⚠️")
+                st.dataframe(team_data, use_container_width=True, hide_index=True)
+                return
+            st.caption(f"{at} 的成绩表共 {len(team_data)} 支队伍，最小标准差保护值 {replay_min_std:g}")
+            tab1, tab2 = st.tabs(["最终成绩排名", "队伍成绩表"])
+            tab1.dataframe(
+                result_data[DISPLAY_COLUMNS],
+                use_container_width=True,
+                hide_index=True,
             )
+            tab2.dataframe(team_data, use_container_width=True, hide_index=True)
 
-        # 可视化
-        if show_dist:
-            st.markdown("### 成绩分布分析")
-            
-            # 获取全局变量中的分组信息，以确保整个应用中使用相同的变量
-            all_groups = sorted(st.session_state.result_data["组别"].unique())
-            all_stations = sorted(st.session_state.result_data["工位"].unique())
-            all_spaces = sorted(st.session_state.result_data["计分空间"].unique())
-            
-            # 绘制分数分布图 - 按组别
-            st.markdown("#### 各组原始平均分分布")
-            fig, ax = plt.subplots(figsize=(12, 6))
-            
-            for group in all_groups:
-                group_data = st.session_state.result_data[st.session_state.result_data["组别"] == group]
-                sns.kdeplot(
-                    group_data["原始平均分"], 
-                    label=f"{group} (平均: {group_data['原始平均分'].mean():.1f})",
-                    fill=True,
-                    alpha=0.3
-                )
-            
-            ax.set_xlabel("原始平均分数", fontsize=12)
-            ax.set_ylabel("密度", fontsize=12)
-            ax.set_title("各组分数分布对比", fontsize=14)
-            ax.grid(True, linestyle="--", alpha=0.3)
-            ax.legend()
-            st.pyplot(fig)
-            
-            # 绘制分数分布图 - 按工位
-            st.markdown("#### 各工位原始平均分分布")
-            fig, ax = plt.subplots(figsize=(12, 6))
-            
-            for station in all_stations:
-                station_data = st.session_state.result_data[st.session_state.result_data["工位"] == station]
-                sns.kdeplot(
-                    station_data["原始平均分"], 
-                    label=f"{station} (平均: {station_data['原始平均分'].mean():.1f})",
-                    fill=True,
-                    alpha=0.3
-                )
-            
-            ax.set_xlabel("原始平均分数", fontsize=12)
-            ax.set_ylabel("密度", fontsize=12)
-            ax.set_title("各工位分数分布对比", fontsize=14)
-            ax.grid(True, linestyle="--", alpha=0.3)
-            ax.legend()
-            st.pyplot(fig)
-            
-            # 绘制最终成绩分布图 - 按组别
-            st.markdown("#### 各组最终成绩分布")
-            fig, ax = plt.subplots(figsize=(12, 6))
-            
-            for group in all_groups:
-                group_data = st.session_state.result_data[st.session_state.result_data["组别"] == group]
-                sns.kdeplot(
-                    group_data["最终成绩"], 
-                    label=f"{group} (平均: {group_data['最终成绩'].mean():.1f})",
-                    fill=True,
-                    alpha=0.3
-                )
-            
-            ax.set_xlabel("最终成绩", fontsize=12)
-            ax.set_ylabel("密度", fontsize=12)
-            ax.set_title("各组最终成绩分布对比", fontsize=14)
-            ax.axvline(70, color="red", linestyle="--", label="基准分: 70")
-            ax.grid(True, linestyle="--", alpha=0.3)
-            ax.legend()
-            st.pyplot(fig)
-            
-            # 绘制最终成绩分布图 - 按工位
-            st.markdown("#### 各工位最终成绩分布")
-            fig, ax = plt.subplots(figsize=(12, 6))
-            
-            for station in all_stations:
-                station_data = st.session_state.result_data[st.session_state.result_data["工位"] == station]
-                sns.kdeplot(
-                    station_data["最终成绩"], 
-                    label=f"{station} (平均: {station_data['最终成绩'].mean():.1f})",
-                    fill=True,
-                    alpha=0.3
-                )
-            
-            ax.set_xlabel("最终成绩", fontsize=12)
-            ax.set_ylabel("密度", fontsize=12)
-            ax.set_title("各工位最终成绩分布对比", fontsize=14)
-            ax.axvline(70, color="red", linestyle="--", label="基准分: 70")
-            ax.grid(True, linestyle="--", alpha=0.3)
-            ax.legend()
-            st.pyplot(fig)
-            
-            # 绘制最终成绩分布图 - 按计分空间
-            st.markdown("#### 各计分空间最终成绩分布")
-            if len(all_spaces) > 10:
-                st.toast("计分空间数量过多，为了可视化效果，仅显示队伍数量最多的10个计分空间", icon="⚠️")
-                # 计算每个计分空间的队伍数量
-                space_team_counts = {}
-                for space in all_spaces:
-                    space_team_counts[space] = len(st.session_state.result_data[st.session_state.result_data["计分空间"] == space])
-                
-                # 取队伍数量最多的10个计分空间
-                top_spaces = sorted(space_team_counts.items(), key=lambda x: x[1], reverse=True)[:10]
-                display_spaces = [space for space, _ in top_spaces]
-            else:
-                display_spaces = all_spaces
-                
-            fig, ax = plt.subplots(figsize=(12, 6))
-            
-            for space in display_spaces:
-                space_data = st.session_state.result_data[st.session_state.result_data["计分空间"] == space]
-                sns.kdeplot(
-                    space_data["最终成绩"], 
-                    label=f"{space} (平均: {space_data['最终成绩'].mean():.1f})",
-                    fill=True,
-                    alpha=0.3
+
+history_section()
+
+# ------------------------------------------ 多赛道批量处理 ------------------------------------- #
+
+@st.fragment
+def batch_section():
+    """多赛道批量处理：上传与计算只重跑这一区域"""
+    with st.expander("多赛道批量处理"):
+        # 每个文件为一个赛道，各赛道在独立进程中并行计算，结果合并为一个多工作表报表
+        track_files = st.file_uploader(
+            "上传多个赛道的成绩文件",
+            type=["xlsx", "csv"],
+            accept_multiple_files=True,
+            help="每个文件为一个赛道，文件名作为赛道名称；计算规则与当前页面相同",
+            key="track_file_uploader",
+        )
+        if track_files and st.button("批量计算", key="run_batch"):
+            tracks = []
+            with timer.phase("batch", files=len(track_files)) as record:
+                outcomes = run_batch(
+                    [uploaded.getvalue() for uploaded in track_files],
+                    min_std,
+                    st.session_state.judge_trim,
+                    names=[uploaded.name for uploaded in track_files],
                 )
-            
-            ax.set_xlabel("最终成绩", fontsize=12)
-            ax.set_ylabel("密度", fontsize=12)
-            ax.set_title("各计分空间最终成绩分布对比", fontsize=14)
-            ax.axvline(70, color="red", linestyle="--", label="基准分: 70")
-            ax.grid(True, linestyle="--", alpha=0.3)
-            ax.legend()
-            st.pyplot(fig)
-            
-            # 散点图展示转换关系 - 按组别
-            st.markdown("#### 原始平均分与标准分关系（按组别）")
-            # 确保用于绘图的数据是数值类型
-            try:
-                fig, ax = plt.subplots(figsize=(10, 6))
-                
-                for group in all_groups:
-                    group_data = st.session_state.result_data[st.session_state.result_data["组别"] == group].copy()
-                    
-                    # 转换为数值类型
-                    group_data["原始平均分"] = pd.to_numeric(group_data["原始平均分"], errors="coerce")
-                    group_data["最终成绩"] = pd.to_numeric(group_data["最终成绩"], errors="coerce")
-                    
-                    # 删除任何NaN值
-                    group_data = group_data.dropna(subset=["原始平均分", "最终成绩"])
-                    
-                    if len(group_data) >= 2:  # 确保至少有两个数据点用于绘图
-                        ax.scatter(
-                            group_data["原始平均分"], 
-                            group_data["最终成绩"],
-                            s=80, 
-                            alpha=0.7,
-                            label=group
-                        )
-                        
-                        # 添加队伍名称作为数据点标签
-                        for idx, row in group_data.iterrows():
-                            ax.annotate(
-                                row["队伍名称"],
-                                (row["原始平均分"], row["最终成绩"]),
-                                xytext=(5, 5),
-                                textcoords='offset points',
-                                fontsize=8
-                            )
-                
-                ax.set_title("各组原始平均分与标准分转换关系", fontsize=14)
-                ax.set_xlabel("原始平均分数", fontsize=12)
-                ax.set_ylabel("最终成绩", fontsize=12)
-                ax.grid(True, linestyle="--", alpha=0.3)
-                ax.legend()
-                
-                st.pyplot(fig)
-                
-                # 散点图展示转换关系 - 按工位
-                st.markdown("#### 原始平均分与标准分关系（按工位）")
-                fig, ax = plt.subplots(figsize=(10, 6))
-                
-                for station in all_stations:
-                    station_data = st.session_state.result_data[st.session_state.result_data["工位"] == station].copy()
-                    
-                    # 转换为数值类型
-                    station_data["原始平均分"] = pd.to_numeric(station_data["原始平均分"], errors="coerce")
-                    station_data["最终成绩"] = pd.to_numeric(station_data["最终成绩"], errors="coerce")
-                    
-                    # 删除任何NaN值
-                    station_data = station_data.dropna(subset=["原始平均分", "最终成绩"])
-                    
-                    if len(station_data) >= 2:  # 确保至少有两个数据点用于绘图
-                        ax.scatter(
-                            station_data["原始平均分"], 
-                            station_data["最终成绩"],
-                            s=80, 
-                            alpha=0.7,
-                            label=station
-                        )
-                        
-                        # 添加队伍名称作为数据点标签
-                        for idx, row in station_data.iterrows():
-                            ax.annotate(
-                                row["队伍名称"],
-                                (row["原始平均分"], row["最终成绩"]),
-                                xytext=(5, 5),
-                                textcoords='offset points',
-                                fontsize=8
-                            )
-                
-                ax.set_title("各工位原始平均分与标准分转换关系", fontsize=14)
-                ax.set_xlabel("原始平均分数", fontsize=12)
-                ax.set_ylabel("最终成绩", fontsize=12)
-                ax.grid(True, linestyle="--", alpha=0.3)
-                ax.legend()
-                
-                st.pyplot(fig)
-                
-                # 散点图展示转换关系 - 按计分空间
-                st.markdown("#### 原始平均分与标准分关系（按计分空间）")
-                
-                # 与前面类似，限制展示的计分空间数量
-                if len(all_spaces) > 8:  # 为了图表清晰度，限制更严格
-                    st.toast("计分空间数量过多，为了可视化效果，仅显示队伍数量最多的8个计分空间", icon="⚠️")
-                    # 计算每个计分空间的队伍数量
-                    space_team_counts = {}
-                    for space in all_spaces:
-                        space_team_counts[space] = len(st.session_state.result_data[st.session_state.result_data["计分空间"] == space])
-                    
-                    # 取队伍数量最多的8个计分空间
-                    top_spaces = sorted(space_team_counts.items(), key=lambda x: x[1], reverse=True)[:8]
-                    display_spaces = [space for space, _ in top_spaces]
-                else:
-                    display_spaces = all_spaces
-                
-                fig, ax = plt.subplots(figsize=(10, 6))
-                
-                for space in display_spaces:
-                    space_data = st.session_state.result_data[st.session_state.result_data["计分空间"] == space].copy()
-                    
-                    # 转换为数值类型
-                    space_data["原始平均分"] = pd.to_numeric(space_data["原始平均分"], errors="coerce")
-                    space_data["最终成绩"] = pd.to_numeric(space_data["最终成绩"], errors="coerce")
-                    
-                    # 删除任何NaN值
-                    space_data = space_data.dropna(subset=["原始平均分", "最终成绩"])
-                    
-                    if len(space_data) >= 2:  # 确保至少有两个数据点用于绘图
-                        ax.scatter(
-                            space_data["原始平均分"], 
-                            space_data["最终成绩"],
-                            s=80, 
-                            alpha=0.7,
-                            label=space
-                        )
-                        
-                        # 添加队伍名称作为数据点标签
-                        for idx, row in space_data.iterrows():
-                            ax.annotate(
-                                row["队伍名称"],
-                                (row["原始平均分"], row["最终成绩"]),
-                                xytext=(5, 5),
-                                textcoords='offset points',
-                                fontsize=8
-                            )
-                
-                ax.set_title("各计分空间原始平均分与标准分转换关系", fontsize=14)
-                ax.set_xlabel("原始平均分数", fontsize=12)
-                ax.set_ylabel("最终成绩", fontsize=12)
-                ax.grid(True, linestyle="--", alpha=0.3)
-                ax.legend()
-                
-                st.pyplot(fig)
-                
-                # 添加工位分数分布图
-                st.markdown("#### 各工位得分情况")
-                
-                if not st.session_state.team_data.empty:
-                    # 工位得分对比
-                    station_data = st.session_state.team_data.copy()
-                    
-                    fig, ax = plt.subplots(figsize=(10, 6))
-                    sns.barplot(x="工位", y="原始分", data=station_data, palette="Blues_d", ax=ax)
-                    ax.set_title("各工位得分情况", fontsize=14)
-                    ax.set_ylim(0, 100)
-                    
-                    # 在柱状图上标注数值
-                    for p in ax.patches:
-                        ax.annotate(
-                            f"{p.get_height():.1f}",
-                            (p.get_x() + p.get_width() / 2., p.get_height()),
-                            ha = 'center',
-                            va = 'bottom',
-                            fontsize=10
-                        )
-                    
-                    st.pyplot(fig)
-                    
-                    # 显示工位详细信息
-                    st.markdown("#### 工位详细信息")
-                    station_info = station_data[["工位", "队伍名称", "组别", "原始分"]].sort_values(by="工位")
-                    st.dataframe(
-                        station_info,
-                        use_container_width=True,
-                        hide_index=True
-                    )
-                    
-            except Exception as e:
-                st.toast(f"绘图时发生错误: {str(e)}", icon="❌")
+                for uploaded, (_, outcome) in zip(track_files, outcomes):
+                    if isinstance(outcome, Exception):
+                        st.toast(f"{uploaded.name}: 文件处理出错: {outcome}", icon="❌")
+                    else:
+                        tracks.append(outcome)
+                record["rows"] = sum(len(track.result_data) for track in tracks)
+            st.session_state.batch_report = (track_summary(tracks), to_report_bytes(tracks)) if tracks else None
+
+        if st.session_state.get("batch_report") is not None:
+            summary, report_bytes = st.session_state.batch_report
+            st.dataframe(summary, use_container_width=True, hide_index=True)
+            st.download_button(
+                label="导出多赛道汇总报表",
+                data=report_bytes,
+                file_name=REPORT_FILE_NAME,
+                mime="application/vnd.ms-excel",
+                on_click="ignore",
+            )
+
+
+batch_section()
+
+# ------------------------------------------ 性能调试面板 ------------------------------------- #
+
+if debug_mode:
+    with debug_panel.container():
+        st.markdown("**性能调试**")
+        if timer.records:
+            records = pd.DataFrame(list(timer.records)).tail(20)
+            st.dataframe(records[["phase", "seconds", "rows"]], use_container_width=True, hide_index=True)
+        else:
+            st.caption("暂无计时记录")
 
 # ----------------------------------------- 页脚 ---------------------------------------------- #
 
@@ -0,0 +1,139 @@
+"""
+成绩计算流水线
+
+从录入的队伍成绩出发，完成计分空间标准分转换、多维度排名、奖项评定与总体统计。
+页面中的"计算最终成绩"与命令行批处理都调用这里，保证两处计算规则一致。
+"""
+
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from awards import add_awards
+from ingest import REQUIRED_COLUMNS
+from instrumentation import PhaseTimer
+from ranking import compute_ranks
+from scoring import compute_scores
+
+# 进行计算所需的最少队伍数量
+MIN_TEAMS = 2
+# 最小标准差保护值的取值范围（页面滑动条的范围）
+MIN_STD_RANGE = (1.0, 20.0)
+# 组别统计表的列顺序
+GROUP_STATS_COLUMNS = ["组别", "队伍数量", "平均分", "标准差", "最高分", "最低分"]
+
+
+def team_row_hashes(team_data):
+    """成绩表的逐行哈希（uint64 数组），每行的哈希只取决于该行的取值，修改部分行时可只重算这些行"""
+    return pd.util.hash_pandas_object(team_data, index=False).to_numpy()
+
+
+def team_data_hash(team_data, row_hashes=None):
+    """计算队伍成绩表的内容哈希，列名与各行取值参与计算，与行索引无关
+
+    row_hashes 为已知的逐行哈希（见 team_row_hashes），省略时重新计算。
+    基于 pandas 内部的逐行哈希，只在进程内作为结果版本号使用；报表中的校验码见 team_data_checksum。
+    """
+    if row_hashes is None:
+        row_hashes = team_row_hashes(team_data)
+    hasher = hashlib.sha256()
+    hasher.update("\x1f".join(map(str, team_data.columns)).encode("utf-8"))
+    hasher.update(row_hashes.tobytes())
+    return hasher.hexdigest()
+
+
+def team_data_checksum(team_data):
+    """成绩表的 SHA-256 校验码，记录在正式报表中供申诉复核
+
+    对规范化的 CSV 计算：组别、工位、队伍名称、原始分 四列，按这四列排序（文本按 Unicode 码位），
+    UTF-8 编码、逗号分隔、LF 换行、含表头、不含行号，原始分以 Python 浮点数的最短表示写出（如 80.0）。
+    与文件格式和行顺序无关，可在任何环境中按同样规则重现。
+    """
+    canonical = team_data[REQUIRED_COLUMNS].astype({"组别": str, "工位": str, "队伍名称": str, "原始分": float})
+    canonical = canonical.sort_values(REQUIRED_COLUMNS, kind="stable")
+    return hashlib.sha256(canonical.to_csv(index=False, lineterminator="\n").encode("utf-8")).hexdigest()
+
+
+def result_key(data_hash, min_std):
+    """计算结果的版本号：同一份成绩表与同一最小标准差得到同一版本"""
+    return f"{data_hash[:16]}-{min_std:g}"
+
+
+def result_min_std(key):
+    """从结果版本号中取出计算时使用的最小标准差"""
+    return float(key.rsplit("-", 1)[1])
+
+
+def compute_total_stats(result_data):
+    """计算全体队伍原始平均分的总体统计数据"""
+    total_raw_scores = result_data["原始平均分"].to_numpy(dtype=float)
+    return {
+        "队伍数量": len(result_data),
+        "平均分": np.mean(total_raw_scores),
+        "标准差": np.std(total_raw_scores, ddof=1),
+        "最高分": np.max(total_raw_scores),
+        "最低分": np.min(total_raw_scores),
+    }
+
+
+def compute_group_stats(result_data):
+    """按组别统计原始平均分：队伍数量、平均分、样本标准差、最高分与最低分（组别按名称排序）"""
+    group_stats = (
+        result_data.groupby("组别", sort=True, observed=True)["原始平均分"]
+        .agg(["size", "mean", "std", "max", "min"])
+        .fillna({"std": 0.0})
+        .reset_index()
+    )
+    group_stats.columns = GROUP_STATS_COLUMNS
+    return group_stats
+
+
+def run_pipeline(team_data, min_std, timer=None):
+    """计算最终成绩
+
+    参数:
+        team_data: 包含 "组别"、"工位"、"队伍名称"、"原始分" 列的 DataFrame
+        min_std: 最小标准差保护值
+        timer: 可选的 PhaseTimer，用于记录 score、rank、awards、stats 各阶段耗时
+
+    返回:
+        (result_data, space_stats, total_stats)
+        result_data 的行索引为队伍在 team_data 中的位置
+    """
+    if len(team_data) < MIN_TEAMS:
+        raise ValueError(f"至少需要{MIN_TEAMS}支队伍才能进行计算！")
+
+    timer = timer or PhaseTimer()
+    rows = len(team_data)
+
+    # 重命名原始分为原始平均分（因为每队只有一个工位，所以原始分就是原始平均分）
+    raw_data = team_data.reset_index(drop=True).rename(columns={"原始分": "原始平均分"})
+
+    # 一次性完成所有计分空间的统计与标准分转换
+    with timer.phase("score", rows=rows):
+        result_data, space_stats = compute_scores(raw_data, min_std)
+
+    # 在组别、工位、计分空间各维度内单独排名
+    with timer.phase("rank", rows=rows):
+        result_data = compute_ranks(result_data)
+        # 排序：先按计分空间，再按计分空间内排名，同名次的队伍保持录入顺序
+        result_data = result_data.sort_values(by=["计分空间", "计分空间内排名"], kind="stable")
+
+    # 按默认获奖比例在各组别内评定奖项
+    with timer.phase("awards", rows=rows):
+        result_data = add_awards(result_data)
+
+    with timer.phase("stats", rows=rows):
+        total_stats = compute_total_stats(result_data)
+
+    return result_data, space_stats, total_stats
+
+
+def single_team_warnings(space_stats):
+    """为只有一支队伍的计分空间生成警告信息"""
+    single_spaces = space_stats[space_stats["队伍数量"] <= 1]
+    return [
+        f"警告: '{space}' (工位: {station}, 组别: {group}) 内只有一支队伍，无法进行标准分转换，已设置为基准分70分。"
+        for space, station, group in single_spaces[["计分空间", "工位", "组别"]].itertuples(index=False)
+    ]
@@ -0,0 +1,38 @@
+"""
+多维度排名引擎
+
+每个排名维度都是一次分组 rank 运算（同分取最小名次），
+不再按唯一值逐个过滤全表，排名耗时与队伍数量线性相关、与工位/组别数量无关。
+"""
+
+# 默认排名维度：排名列名 -> 分组列（可以是单列名，也可以是多列组合）
+RANK_DIMENSIONS = {
+    "组内排名": "组别",
+    "工位内排名": "工位",
+    "计分空间内排名": "计分空间",
+}
+
+
+def compute_ranks(result_data, dimensions=None, score_column="最终成绩"):
+    """在各个维度内按成绩从高到低排名
+
+    参数:
+        result_data: 已包含成绩列的 DataFrame
+        dimensions: 排名列名 -> 分组列 的映射，默认使用 RANK_DIMENSIONS；
+            可额外加入如 {"校内排名": "学校"} 或 {"赛区组内排名": ["赛区", "组别"]} 的维度
+        score_column: 用于排名的成绩列
+
+    返回:
+        新增各排名列（整数，同分并列取最小名次）后的 DataFrame 副本
+    """
+    if dimensions is None:
+        dimensions = RANK_DIMENSIONS
+
+    ranked = result_data.copy()
+    for rank_column, keys in dimensions.items():
+        ranked[rank_column] = (
+            ranked.groupby(keys, sort=False, dropna=False, observed=True)[score_column]
+            .rank(ascending=False, method="min")
+            .astype(int)
+        )
+    return ranked
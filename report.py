@@ -0,0 +1,128 @@
+"""
+正式成绩报表
+
+Excel 报表包含总体统计、组别统计、计分空间统计、奖项名次线、计算参数（最小标准差与成绩表校验码）
+以及每个组别一个的排名工作表，全部以 xlsxwriter 的 constant_memory 模式逐行写出，
+内存占用与队伍数量无关。PDF 摘要供张榜公示打印，包含统计表与各组别前列队伍的排名。
+"""
+
+from datetime import datetime
+from io import BytesIO
+
+import pandas as pd
+import xlsxwriter
+
+from awards import allocate_awards
+from charts import configure_matplotlib
+from exports import unique_sheet_names, write_excel_sheet
+from pipeline import compute_group_stats
+from scoring import SPACE_STATS_COLUMNS
+
+# 组别排名工作表的字段顺序
+RANKING_COLUMNS = ["组内排名", "队伍名称", "工位", "计分空间", "原始平均分", "最终成绩", "奖项", "计分空间内排名", "工位内排名"]
+# 统计工作表名称
+SUMMARY_SHEETS = ["总体统计", "组别统计", "计分空间统计", "奖项名次线", "计算参数"]
+# PDF 摘要中每个组别列出的队伍数量与每页表格行数
+PDF_TOP_TEAMS = 50
+PDF_ROWS_PER_PAGE = 40
+# A4 纵向页面尺寸（英寸）
+PDF_PAGE_SIZE = (8.27, 11.69)
+
+
+def report_parameters(min_std, checksum, **extra):
+    """报表中记录的计算参数：附加参数（如 赛事、赛道）、最小标准差、成绩表校验码与生成时间
+
+    checksum 为 pipeline.team_data_checksum 给出的规范化成绩表 SHA-256。
+    """
+    return {
+        **extra,
+        "最小标准差保护值": min_std,
+        "成绩表校验码(SHA-256)": checksum,
+        "生成时间": datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+def _summary_tables(result_data, space_stats, total_stats, parameters):
+    """报表中的统计表：(名称, DataFrame) 列表，顺序与 SUMMARY_SHEETS 一致"""
+    total = pd.DataFrame({"指标": list(total_stats), "数值": [round(float(v), 2) for v in total_stats.values()]})
+    group_stats = compute_group_stats(result_data).round(2)
+    spaces = space_stats[SPACE_STATS_COLUMNS].round(2)
+    cutoffs = allocate_awards(result_data).cutoffs.round(2)
+    params = pd.DataFrame({"参数": list(parameters), "值": [str(v) for v in parameters.values()]})
+    return list(zip(SUMMARY_SHEETS, [total, group_stats, spaces, cutoffs, params]))
+
+
+def _group_rankings(result_data):
+    """按组别拆分的排名表：逐个生成 (组别, 按组内排名排序的 DataFrame)，同一时间只复制一个组别的数据"""
+    for group, index in result_data.groupby("组别", sort=True, observed=True).indices.items():
+        yield group, result_data.iloc[index][RANKING_COLUMNS].sort_values("组内排名", kind="stable")
+
+
+def to_report_bytes(result_data, space_stats, total_stats, parameters):
+    """生成多工作表 Excel 报表内容
+
+    参数:
+        parameters: report_parameters 生成的计算参数
+    """
+    buffer = BytesIO()
+    workbook = xlsxwriter.Workbook(buffer, {"constant_memory": True})
+    for sheet_name, frame in _summary_tables(result_data, space_stats, total_stats, parameters):
+        write_excel_sheet(workbook, sheet_name, frame)
+
+    # 工作表名称由组别名称确定，排名表逐个组别生成并写出
+    groups = result_data.groupby("组别", sort=True, observed=True).size().index
+    sheet_names = unique_sheet_names([f"{group}排名" for group in groups], reserved=SUMMARY_SHEETS)
+    for sheet_name, (_, frame) in zip(sheet_names, _group_rankings(result_data)):
+        write_excel_sheet(workbook, sheet_name, frame)
+    workbook.close()
+    return buffer.getvalue()
+
+
+def _pdf_table_pages(pdf, title, frame):
+    """把表格按 PDF_ROWS_PER_PAGE 行分页写入 PDF"""
+    from matplotlib.figure import Figure
+
+    n_pages = max(1, -(-len(frame) // PDF_ROWS_PER_PAGE))
+    for page in range(n_pages):
+        chunk = frame.iloc[page * PDF_ROWS_PER_PAGE:(page + 1) * PDF_ROWS_PER_PAGE]
+        fig = Figure(figsize=PDF_PAGE_SIZE)
+        try:
+            ax = fig.add_subplot()
+            ax.axis("off")
+            ax.set_title(title if n_pages == 1 else f"{title}（{page + 1}/{n_pages}）", fontsize=14)
+            table = ax.table(
+                cellText=chunk.astype(str).to_numpy(),
+                colLabels=[str(col) for col in chunk.columns],
+                loc="upper center",
+                cellLoc="center",
+            )
+            table.auto_set_font_size(False)
+            table.set_fontsize(8)
+            table.scale(1, 1.3)
+            pdf.savefig(fig)
+        finally:
+            fig.clear()
+
+
+def to_pdf_bytes(result_data, space_stats, total_stats, parameters):
+    """生成可打印的 PDF 摘要：统计表与各组别前 PDF_TOP_TEAMS 名的排名，标题含参数中的赛道名称"""
+    # 绘图库较重，只在生成 PDF 时导入并设置中文字体
+    configure_matplotlib()
+    from matplotlib.backends.backend_pdf import PdfPages
+
+    title = f"{parameters.get('赛道', '')}成绩公示"
+    buffer = BytesIO()
+    with PdfPages(buffer) as pdf:
+        for name, frame in _summary_tables(result_data, space_stats, total_stats, parameters):
+            _pdf_table_pages(pdf, f"{title} - {name}", frame)
+        for group, frame in _group_rankings(result_data):
+            top = frame[frame["组内排名"] <= PDF_TOP_TEAMS]
+            _pdf_table_pages(pdf, f"{title} - {group}（前 {PDF_TOP_TEAMS} 名）", top)
+    return buffer.getvalue()
+
+
+# 报表格式 -> (按钮标签, 文件名, MIME 类型, 生成文件内容的函数)
+REPORT_FORMATS = {
+    "report": ("导出完整报表", "技能大赛成绩报表.xlsx", "application/vnd.ms-excel", to_report_bytes),
+    "pdf": ("导出PDF公示", "技能大赛成绩公示.pdf", "application/pdf", to_pdf_bytes),
+}
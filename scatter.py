@@ -0,0 +1,78 @@
+"""
+原始平均分与标准分转换关系的交互式散点图
+
+以 Altair（Vega-Lite）在浏览器端绘制：所有点由列数据一次生成，鼠标悬停显示队伍名称与分数，
+支持缩放与拖动。队伍数量超过 SCATTER_POINT_LIMIT 时改为密度分箱，
+按 分组 × 分数格 统计队伍数量，以点的大小表示密度，传给浏览器的数据量与队伍数量无关。
+Altair 只在生成图表时导入，导入本模块不会加载它。
+"""
+
+import numpy as np
+
+from charts import MAX_SCATTER_SPACES, top_spaces
+
+# 逐点绘制的队伍数量上限，超过时改为密度分箱
+SCATTER_POINT_LIMIT = 5000
+# 密度分箱时每个分数格的宽度（分）
+SCATTER_BIN_WIDTH = 1.0
+
+# 散点图类型 -> (标题, 分组列, 图表标题)
+SCATTER_CHARTS = {
+    "group_scatter": ("原始平均分与标准分关系（按组别）", "组别", "各组原始平均分与标准分转换关系"),
+    "station_scatter": ("原始平均分与标准分关系（按工位）", "工位", "各工位原始平均分与标准分转换关系"),
+    "space_scatter": ("原始平均分与标准分关系（按计分空间）", "计分空间", "各计分空间原始平均分与标准分转换关系"),
+}
+
+
+def scatter_data(chart_type, result_data):
+    """准备散点图数据
+
+    计分空间较多时只保留队伍数量最多的 MAX_SCATTER_SPACES 个；队伍数量超过 SCATTER_POINT_LIMIT 时
+    返回按 分组、原始平均分格、最终成绩格 汇总的 "队伍数量"，否则返回逐队伍的数据。
+    """
+    _, key_column, _ = SCATTER_CHARTS[chart_type]
+    data = result_data[[key_column, "队伍名称", "原始平均分", "最终成绩"]].dropna(subset=["原始平均分", "最终成绩"])
+    if key_column == "计分空间":
+        data = data[data[key_column].isin(top_spaces(result_data, MAX_SCATTER_SPACES))]
+    # 分类列转为字符串，避免未出现的类别进入图例
+    data = data.assign(**{key_column: data[key_column].astype(str)})
+    if len(data) <= SCATTER_POINT_LIMIT:
+        return data.reset_index(drop=True)
+
+    # 取各分数格的中点作为坐标
+    def bin_center(values):
+        return (np.floor(values.to_numpy(dtype=float) / SCATTER_BIN_WIDTH) + 0.5) * SCATTER_BIN_WIDTH
+
+    return (
+        data.assign(原始平均分=bin_center(data["原始平均分"]), 最终成绩=bin_center(data["最终成绩"]))
+        .groupby([key_column, "原始平均分", "最终成绩"], sort=False)
+        .size()
+        .reset_index(name="队伍数量")
+    )
+
+
+def scatter_chart(chart_type, data):
+    """由 scatter_data 的结果生成交互式散点图"""
+    import altair as alt
+
+    _, key_column, title = SCATTER_CHARTS[chart_type]
+    x = alt.X("原始平均分:Q", title="原始平均分数", scale=alt.Scale(zero=False))
+    y = alt.Y("最终成绩:Q", title="最终成绩", scale=alt.Scale(zero=False))
+    color = alt.Color(f"{key_column}:N", title=key_column)
+
+    if "队伍数量" in data.columns:
+        chart = alt.Chart(data).mark_circle(opacity=0.6).encode(
+            x=x,
+            y=y,
+            color=color,
+            size=alt.Size("队伍数量:Q", title="队伍数量"),
+            tooltip=[key_column, "原始平均分", "最终成绩", "队伍数量"],
+        )
+    else:
+        chart = alt.Chart(data).mark_circle(size=80, opacity=0.7).encode(
+            x=x,
+            y=y,
+            color=color,
+            tooltip=["队伍名称", key_column, "原始平均分", "最终成绩"],
+        )
+    return chart.properties(title=title, height=450).interactive()
@@ -0,0 +1,122 @@
+"""
+计分空间标准分转换引擎
+
+以"工位+组别"作为联合计分空间，在一次分组聚合中求出所有计分空间的队伍数量、
+平均分、样本标准差、最高分与最低分，再以数组运算完成标准分转换：
+最小标准差保护、单队伍（或零方差）计分空间回退到基准分 70 分、0-100 截断。
+
+组别、工位、计分空间均以分类（整数编码）列保存，计分空间编码由工位编码与组别编码组合得到，
+"工位-组别" 形式的标签只为每个计分空间生成一次。
+"""
+
+import numpy as np
+import pandas as pd
+
+# 基准分：计分空间平均水平对应的标准分
+BASE_SCORE = 70.0
+# 每偏离一个标准差对应的分值
+SCORE_SCALE = 10.0
+# 标准分上下限
+SCORE_MIN, SCORE_MAX = 0.0, 100.0
+
+# 计分空间统计表的列顺序
+SPACE_STATS_COLUMNS = ["计分空间", "工位", "组别", "队伍数量", "平均分", "标准差", "最高分", "最低分"]
+
+
+def normalize_scores(raw_scores, space_avg, space_std, min_std):
+    """标准分转换公式（数组版），带安全处理
+
+    参数均为逐队伍对齐的 NumPy 数组（min_std 为标量）：
+    - 标准差小于 min_std 时使用 min_std 作为有效标准差
+    - 标准差为零（含计分空间内只有一支队伍）时直接返回基准分 70 分
+    - 结果限制在 0-100 区间并保留一位小数
+    """
+    raw_scores = np.asarray(raw_scores, dtype=float)
+    space_avg = np.asarray(space_avg, dtype=float)
+    space_std = np.asarray(space_std, dtype=float)
+
+    # 如果标准差过小或为零，使用最小标准差值
+    effective_std = np.maximum(space_std, min_std)
+    scores = BASE_SCORE + SCORE_SCALE * (raw_scores - space_avg) / effective_std
+    scores = np.clip(scores, SCORE_MIN, SCORE_MAX).round(1)
+
+    # 如果只有一个分数（或所有分数相同），返回70分(基准分)
+    return np.where(np.isclose(space_std, 0), BASE_SCORE, scores)
+
+
+def encode_spaces(stations, groups):
+    """把工位、组别编码为整数，并组合出计分空间编码
+
+    返回:
+        (space_codes, space_table)
+        space_codes 为逐行的计分空间编码（0..k-1，按工位、组别排序）；
+        space_table 为按编码排列的计分空间查找表，含 "计分空间"、"工位"、"组别" 三列。
+    """
+    station_codes, station_labels = pd.factorize(stations, sort=True, use_na_sentinel=False)
+    group_codes, group_labels = pd.factorize(groups, sort=True, use_na_sentinel=False)
+    n_groups = max(len(group_labels), 1)
+    space_codes, space_keys = pd.factorize(station_codes.astype(np.int64) * n_groups + group_codes, sort=True)
+
+    space_table = pd.DataFrame({
+        "工位": np.asarray(station_labels, dtype=object)[space_keys // n_groups],
+        "组别": np.asarray(group_labels, dtype=object)[space_keys % n_groups],
+    })
+    labels = space_table["工位"].astype(str) + "-" + space_table["组别"].astype(str)
+    # 工位或组别名称本身含 "-" 时标签可能重复，为重复的标签追加编号以保证唯一
+    duplicated = labels.duplicated(keep=False)
+    labels[duplicated] = labels[duplicated] + "#" + labels.index[duplicated].astype(str)
+    space_table.insert(0, "计分空间", labels)
+    return space_codes, space_table
+
+
+def compute_scores(raw_data, min_std):
+    """计算所有队伍的最终成绩
+
+    参数:
+        raw_data: 包含 "组别"、"工位"、"队伍名称"、"原始平均分" 列的 DataFrame
+        min_std: 最小标准差保护值
+
+    返回:
+        (result_data, space_stats)
+        result_data 为 raw_data 的副本，"组别"、"工位" 转为分类列，新增分类列 "计分空间" 与 "最终成绩" 列；
+        space_stats 为每个计分空间一行的统计 DataFrame（按计分空间编码排列），列见 SPACE_STATS_COLUMNS。
+    """
+    result_data = raw_data.copy()
+
+    # 创建"工位+组别"的联合计分空间，编码为 0..k-1 的整数
+    codes, space_table = encode_spaces(result_data["工位"], result_data["组别"])
+    n_spaces = len(space_table)
+    result_data["组别"] = result_data["组别"].astype("category")
+    result_data["工位"] = result_data["工位"].astype("category")
+    result_data["计分空间"] = pd.Categorical.from_codes(codes, categories=space_table["计分空间"])
+    raw_scores = result_data["原始平均分"].to_numpy(dtype=float)
+
+    # 一次性计算所有计分空间的统计指标
+    counts = np.bincount(codes, minlength=n_spaces)
+    space_avg = np.bincount(codes, weights=raw_scores, minlength=n_spaces) / counts
+    deviations = raw_scores - space_avg[codes]
+    sq_sums = np.bincount(codes, weights=deviations * deviations, minlength=n_spaces)
+    # 样本标准差；只有一支队伍的计分空间记为 0
+    space_std = np.zeros(n_spaces)
+    multi = counts > 1
+    space_std[multi] = np.sqrt(sq_sums[multi] / (counts[multi] - 1))
+    space_max = np.full(n_spaces, -np.inf)
+    space_min = np.full(n_spaces, np.inf)
+    np.maximum.at(space_max, codes, raw_scores)
+    np.minimum.at(space_min, codes, raw_scores)
+
+    # 应用标准分转换
+    result_data["最终成绩"] = normalize_scores(raw_scores, space_avg[codes], space_std[codes], min_std)
+
+    space_stats = pd.DataFrame({
+        "计分空间": space_table["计分空间"],
+        "工位": space_table["工位"],
+        "组别": space_table["组别"],
+        "队伍数量": counts,
+        "平均分": space_avg,
+        "标准差": space_std,
+        "最高分": space_max,
+        "最低分": space_min,
+    }, columns=SPACE_STATS_COLUMNS)
+
+    return result_data, space_stats
@@ -0,0 +1,111 @@
+"""
+最小标准差敏感性分析
+
+在一次广播运算中对一组最小标准差保护值同时完成所有计分空间的标准分转换
+（队伍数 × 取值数 的成绩矩阵），再对矩阵的所有列一次完成组内排名，
+统计每支队伍的最终成绩、组内排名在各取值下的变化范围，并标出奖项等级会随取值变化的队伍。
+"""
+
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from awards import DEFAULT_AWARD_QUOTAS, NO_AWARD, quota_counts
+from scoring import normalize_scores
+
+# 默认扫描的最小标准差取值：与侧边栏滑动条的范围和步长一致
+DEFAULT_GRID = np.arange(1.0, 20.5, 0.5)
+REPORT_COLUMNS = [
+    "组别", "工位", "队伍名称", "原始平均分", "最终成绩", "组内排名",
+    "最低成绩", "最高成绩", "最好组内排名", "最差组内排名", "排名变化幅度", "可能奖项", "奖项变化",
+]
+
+# 一次扫描结果：取值网格、成绩矩阵、组内排名矩阵、奖项等级矩阵与逐队伍报告
+SweepResult = namedtuple("SweepResult", ["grid", "scores", "group_ranks", "bands", "report"])
+
+
+def award_bands(group_ranks, group_sizes, quotas=None):
+    """按获奖比例把组内排名划分为奖项等级
+
+    参数:
+        group_ranks: 组内排名数组（可为二维，每列一个最小标准差取值）
+        group_sizes: 与 group_ranks 行对齐的组别队伍数量
+        quotas: 奖项名称 -> 比例，按奖项从高到低排列
+
+    返回:
+        与 group_ranks 同形状的整数数组，0 表示第一个奖项，len(quotas) 表示未获奖。
+        名次不超过累计名额（awards.quota_counts）的队伍获得该奖项，同分并列时一并获奖，
+        与 awards.allocate_awards 的 "并列均获奖" 规则一致。
+    """
+    if quotas is None:
+        quotas = DEFAULT_AWARD_QUOTAS
+    group_ranks = np.asarray(group_ranks)
+    cut_ranks = quota_counts(group_sizes, quotas)
+    cut_ranks = cut_ranks.reshape(cut_ranks.shape[:1] + (1,) * (group_ranks.ndim - 1) + cut_ranks.shape[1:])
+    return (group_ranks[..., None] > cut_ranks).sum(axis=-1)
+
+
+def sweep_min_std(result_data, space_stats, grid=None, quotas=None):
+    """在一组最小标准差取值下重新计算所有队伍的最终成绩与组内排名
+
+    参数:
+        result_data: run_pipeline 返回的成绩表
+        space_stats: run_pipeline 返回的计分空间统计
+        grid: 最小标准差取值序列，默认使用 DEFAULT_GRID
+        quotas: 奖项名称 -> 比例，默认使用 DEFAULT_AWARD_QUOTAS
+
+    返回:
+        SweepResult；report 为逐队伍的 DataFrame，列见 REPORT_COLUMNS，奖项会变化的队伍排在前面。
+    """
+    grid = np.asarray(DEFAULT_GRID if grid is None else grid, dtype=float)
+    if quotas is None:
+        quotas = DEFAULT_AWARD_QUOTAS
+
+    # 每支队伍所在计分空间的平均分与标准差
+    codes = pd.Index(space_stats["计分空间"]).get_indexer(result_data["计分空间"])
+    space_avg = space_stats["平均分"].to_numpy(dtype=float)[codes]
+    space_std = space_stats["标准差"].to_numpy(dtype=float)[codes]
+    raw_scores = result_data["原始平均分"].to_numpy(dtype=float)
+
+    # 队伍数 × 取值数 的成绩矩阵
+    scores = normalize_scores(raw_scores[:, None], space_avg[:, None], space_std[:, None], grid[None, :])
+
+    # 所有取值的组内排名一次完成：每列在组别内分别排名
+    groups = result_data["组别"].to_numpy()
+    group_ranks = (
+        pd.DataFrame(scores)
+        .groupby(groups, sort=False, dropna=False)
+        .rank(ascending=False, method="min")
+        .to_numpy(dtype=int)
+    )
+    group_sizes = result_data.groupby("组别", sort=False, dropna=False, observed=True)["组别"].transform("size")
+    bands = award_bands(group_ranks, group_sizes.to_numpy(), quotas)
+
+    # 各队伍在扫描范围内出现过的奖项
+    labels = np.array(list(quotas) + [NO_AWARD], dtype=object)
+    best_band, worst_band = bands.min(axis=1), bands.max(axis=1)
+    possible = [
+        "/".join(labels[np.unique(row)]) if low != high else labels[low]
+        for row, low, high in zip(bands, best_band, worst_band)
+    ]
+
+    report = pd.DataFrame({
+        "组别": result_data["组别"].to_numpy(),
+        "工位": result_data["工位"].to_numpy(),
+        "队伍名称": result_data["队伍名称"].to_numpy(),
+        "原始平均分": raw_scores,
+        "最终成绩": result_data["最终成绩"].to_numpy(),
+        "组内排名": result_data["组内排名"].to_numpy(),
+        "最低成绩": scores.min(axis=1),
+        "最高成绩": scores.max(axis=1),
+        "最好组内排名": group_ranks.min(axis=1),
+        "最差组内排名": group_ranks.max(axis=1),
+        "排名变化幅度": group_ranks.max(axis=1) - group_ranks.min(axis=1),
+        "可能奖项": possible,
+        "奖项变化": best_band != worst_band,
+    }, columns=REPORT_COLUMNS)
+    report = report.sort_values(
+        by=["奖项变化", "排名变化幅度", "组别", "组内排名"], ascending=[False, False, True, True], kind="stable",
+    ).reset_index(drop=True)
+    return SweepResult(grid, scores, group_ranks, bands, report)
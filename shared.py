@@ -0,0 +1,225 @@
+"""
+服务端共享的赛事数据集
+
+同一赛事的所有会话读取同一份成绩表与计算结果，计算只在结果版本变化时进行一次，
+结果发布后以版本号通知其他会话。内存与计算量随赛事数量增长，而与观看人数无关。
+已发布的 DataFrame 视为只读，各会话直接引用而不复制。
+其他进程（如 HTTP 接口）写入同一数据库后，下一次取用赛事时按数据库中的版本号发现变化并重新加载。
+"""
+
+import threading
+from collections import OrderedDict, deque, namedtuple
+
+import numpy as np
+
+from incremental import IncrementalScorer
+from pipeline import compute_total_stats, result_key, run_pipeline, team_data_hash, team_row_hashes
+from scoring import SPACE_STATS_COLUMNS
+from store import RESULT_COLUMNS, SOURCE_EDITOR, SOURCE_UPLOAD, RowChanges
+
+# 每个赛事缓存的计算结果版本数，超出后淘汰最久未使用的结果
+RESULT_CACHE_ENTRIES = 8
+
+# 一次计算结果：成绩表、计分空间统计、总体统计与结果版本号
+EventResult = namedtuple("EventResult", ["result_data", "space_stats", "total_stats", "result_key"])
+
+# 等待写入数据库的一次发布：只替换成绩表时 result 为 None
+PendingWrite = namedtuple("PendingWrite", ["team_data", "result", "min_std", "data_hash", "source", "changes"])
+
+
+def _changed_rows(old, new, columns):
+    """逐行比较两张表，返回取值不同的行位置；行数不同时返回 None（需要整表写入）"""
+    if len(old) != len(new):
+        return None
+    changed = np.zeros(len(new), dtype=bool)
+    for column in columns:
+        changed |= old[column].to_numpy() != new[column].to_numpy()
+    return np.flatnonzero(changed)
+
+
+class SharedEvent:
+    """一个赛事的共享数据集
+
+    teams_version 在成绩表被替换时递增，results_version 在发布新的计算结果时递增，
+    会话定时轮询版本号，据此判断是否需要刷新。
+
+    新的数据在内存中发布后按发布顺序排队写入数据库，写入时不持有赛事锁，
+    其他会话的轮询与读取不必等待数据库写入完成。
+    """
+
+    def __init__(self, event, store):
+        self.event = event
+        self._store = store
+        self._lock = threading.RLock()
+        self._write_lock = threading.Lock()
+        self._writes = deque()
+        self._results = OrderedDict()
+        self._scorer = None
+
+        self.teams_version = 0
+        self.results_version = 0
+        self._revision = None
+        self.team_data = None
+        self.result = None
+        self.refresh()
+
+    def refresh(self):
+        """数据库中的赛事数据被其他进程更新后，重新加载成绩表与计算结果
+
+        本进程还有未写完的数据时不重新加载。返回是否重新加载。
+        """
+        with self._lock:
+            if self._writes:
+                return False
+            known = self._revision
+        revision = self._store.event_revision(self.event)
+        if revision == known:
+            return False
+
+        team_data = self._store.load_teams(self.event)
+        result = None
+        # 从数据库恢复最近一次的计算结果
+        saved = self._store.load_results(self.event)
+        if saved is not None:
+            result_data, space_stats, saved_min_std, saved_hash = saved
+            result = EventResult(
+                result_data, space_stats, compute_total_stats(result_data), result_key(saved_hash, saved_min_std),
+            )
+
+        with self._lock:
+            if self._writes or self._revision != known:
+                # 加载期间已有新的数据发布或加载完成
+                return False
+            self._revision = revision
+            self.team_data = team_data
+            self.result = result
+            # 增量计算的基础已不是当前结果，下次计算时重新建立
+            self._scorer = None
+            self.teams_version += 1
+            self.results_version += 1
+            return True
+
+    @property
+    def version(self):
+        return self.teams_version, self.results_version
+
+    def publish_teams(self, team_data, source=SOURCE_UPLOAD):
+        """替换赛事的成绩表并写入数据库，source 为记入修改日志的来源"""
+        with self._lock:
+            self.team_data = team_data
+            self.teams_version += 1
+            # 数据库中的成绩表已不是增量计算的基础
+            self._scorer = None
+            self._writes.append(PendingWrite(team_data, None, None, None, source, None))
+        self._flush()
+
+    def compute(self, team_data, min_std, timer=None, source=SOURCE_EDITOR):
+        """计算并发布结果
+
+        相同成绩表与最小标准差的结果直接复用；只修改了部分原始分时增量更新，否则全量计算。
+        成绩表的变化以 source 为来源记入修改日志，数据库中只写入变化的行。返回 EventResult。
+        """
+        with self._lock:
+            scorer = self._scorer
+            changed = None if scorer is None else scorer.changed_teams(team_data)
+            if changed is None:
+                row_hashes = team_row_hashes(team_data)
+            else:
+                row_hashes = scorer.updated_row_hashes(team_data, changed)
+            data_hash = team_data_hash(team_data, row_hashes)
+            key = result_key(data_hash, min_std)
+            if self.result is not None and self.result.result_key == key:
+                return self.result
+
+            previous = self.result
+            cached = self._results.get(key)
+            if cached is not None:
+                self._results.move_to_end(key)
+                result = cached
+                self._scorer = IncrementalScorer(team_data, min_std, result.result_data, result.space_stats, row_hashes)
+                changes = None
+            elif changed is not None and min_std == scorer.min_std:
+                score_changes = self._update_scorer(team_data, changed, row_hashes, timer)
+                result = EventResult(scorer.result_data, scorer.space_stats, scorer.total_stats, key)
+                changes = RowChanges(changed, score_changes.rows, score_changes.spaces)
+            else:
+                result = EventResult(*run_pipeline(team_data, min_std, timer), key)
+                self._scorer = IncrementalScorer(team_data, min_std, result.result_data, result.space_stats, row_hashes)
+                changes = None
+
+            if changes is None and previous is not None:
+                # 与上一次发布的结果逐行比较，只写入变化的行
+                changes = RowChanges(
+                    changed,
+                    _changed_rows(previous.result_data, result.result_data, RESULT_COLUMNS),
+                    _changed_rows(previous.space_stats, result.space_stats, SPACE_STATS_COLUMNS),
+                )
+
+            self._results[key] = result
+            while len(self._results) > RESULT_CACHE_ENTRIES:
+                self._results.popitem(last=False)
+
+            self.team_data = team_data
+            self.teams_version += 1
+            self.result = result
+            self.results_version += 1
+            self._writes.append(PendingWrite(team_data, result, min_std, data_hash, source, changes))
+        self._flush()
+        return result
+
+    def _update_scorer(self, team_data, changed, row_hashes, timer):
+        """增量更新，返回 ScoreChanges"""
+        if timer is None:
+            return self._scorer.update(team_data, changed, row_hashes)
+        with timer.phase("score", rows=len(team_data), mode="incremental") as record:
+            score_changes = self._scorer.update(team_data, changed, row_hashes)
+            record["changed"] = len(changed)
+        return score_changes
+
+    def _flush(self):
+        """按发布顺序把排队的数据写入数据库
+
+        写入在赛事锁之外进行；写入出错时丢弃其余排队的数据，下次刷新时从数据库重新加载。
+        """
+        with self._write_lock:
+            while True:
+                with self._lock:
+                    if not self._writes:
+                        return
+                    write = self._writes[0]
+                    base_revision = self._revision
+                try:
+                    if write.result is None:
+                        revision = self._store.save_teams(self.event, write.team_data, write.source)
+                    else:
+                        revision = self._store.save_results(
+                            self.event, write.team_data, write.result.result_data, write.result.space_stats,
+                            write.min_std, write.data_hash, write.source, write.changes, base_revision,
+                        )
+                except Exception:
+                    with self._lock:
+                        self._writes.clear()
+                        self._revision = None
+                        self._scorer = None
+                    raise
+                with self._lock:
+                    self._writes.popleft()
+                    self._revision = revision
+
+
+class EventRegistry:
+    """按赛事编号管理共享数据集，每个赛事在进程内只加载一次，此后只在数据库版本变化时重新加载"""
+
+    def __init__(self, store):
+        self._store = store
+        self._lock = threading.Lock()
+        self._events = {}
+
+    def get(self, event):
+        with self._lock:
+            shared = self._events.get(event)
+            if shared is None:
+                shared = self._events[event] = SharedEvent(event, self._store)
+                return shared
+        shared.refresh()
+        return shared
@@ -0,0 +1,405 @@
+"""
+SQLite 赛事数据存储
+
+以 WAL 模式的本地 SQLite 数据库保存各赛事的队伍成绩、计算结果与计分空间统计，
+服务重启或浏览器刷新后可直接恢复，无需重新上传和计算。
+队伍、结果与计分空间统计表以 "行号" 记录各行在表中的位置：整表保存时批量替换，
+只修改了部分行时按行号逐行更新；队伍与结果表另按 组别、工位、计分空间 建立索引。
+
+队伍成绩表的每次变化都在同一事务中追加到只增不改的修改日志（journal），每累计
+SNAPSHOT_INTERVAL 条日志保存一份成绩表快照；replay_teams 从最近的快照出发重建任意时刻的成绩表，
+calculation_at 给出该时刻生效的计算参数，供申诉复核时重现当时的成绩。
+"""
+
+import os
+import sqlite3
+from collections import namedtuple
+from contextlib import closing, contextmanager
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from awards import award_dtype
+from ingest import REQUIRED_COLUMNS
+from journal import (
+    DELETE, JOURNAL_COLUMNS, REORDER, UPSERT, apply_entries, diff_teams, reorder_marker, same_order, upsert_entries,
+)
+from scoring import SPACE_STATS_COLUMNS
+
+# 数据库文件路径，可通过环境变量 SCORING_DB 指定
+DB_PATH_ENV = "SCORING_DB"
+DEFAULT_DB_PATH = Path(__file__).with_name("scoring.db")
+# 未指定赛事时使用的赛事编号
+DEFAULT_EVENT = "default"
+# 自上一份快照起累计的日志条数达到该值时保存新的快照
+SNAPSHOT_INTERVAL = 5000
+
+# 成绩表修改的来源
+SOURCE_UPLOAD = "上传文件"
+SOURCE_EDITOR = "录入表格"
+SOURCE_API = "接口"
+
+RESULT_COLUMNS = [
+    "组别", "工位", "队伍名称", "原始平均分", "计分空间", "最终成绩", "组内排名", "工位内排名", "计分空间内排名", "奖项",
+]
+
+# 保存计算结果时队伍表、结果表与计分空间统计表中需要写入的行位置，为 None 的表整表替换
+RowChanges = namedtuple("RowChanges", ["teams", "rows", "spaces"])
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    event TEXT PRIMARY KEY,
+    updated_at TEXT NOT NULL,
+    min_std REAL,
+    data_hash TEXT,
+    revision INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS teams (
+    event TEXT NOT NULL,
+    "行号" INTEGER NOT NULL,
+    "组别" TEXT,
+    "工位" TEXT,
+    "队伍名称" TEXT,
+    "原始分" REAL
+);
+CREATE INDEX IF NOT EXISTS idx_teams_row ON teams (event, "行号");
+CREATE INDEX IF NOT EXISTS idx_teams_name ON teams (event, "队伍名称", "行号");
+CREATE INDEX IF NOT EXISTS idx_teams_group ON teams (event, "组别");
+CREATE INDEX IF NOT EXISTS idx_teams_station ON teams (event, "工位");
+CREATE TABLE IF NOT EXISTS results (
+    event TEXT NOT NULL,
+    "行号" INTEGER NOT NULL,
+    "组别" TEXT,
+    "工位" TEXT,
+    "队伍名称" TEXT,
+    "原始平均分" REAL,
+    "计分空间" TEXT,
+    "最终成绩" REAL,
+    "组内排名" INTEGER,
+    "工位内排名" INTEGER,
+    "计分空间内排名" INTEGER,
+    "奖项" TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_results_row ON results (event, "行号");
+CREATE INDEX IF NOT EXISTS idx_results_group ON results (event, "组别");
+CREATE INDEX IF NOT EXISTS idx_results_station ON results (event, "工位");
+CREATE INDEX IF NOT EXISTS idx_results_space ON results (event, "计分空间");
+CREATE TABLE IF NOT EXISTS space_stats (
+    event TEXT NOT NULL,
+    "行号" INTEGER NOT NULL,
+    "计分空间" TEXT,
+    "工位" TEXT,
+    "组别" TEXT,
+    "队伍数量" INTEGER,
+    "平均分" REAL,
+    "标准差" REAL,
+    "最高分" REAL,
+    "最低分" REAL
+);
+CREATE INDEX IF NOT EXISTS idx_space_stats_row ON space_stats (event, "行号");
+CREATE TABLE IF NOT EXISTS journal (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    event TEXT NOT NULL,
+    recorded_at TEXT NOT NULL,
+    source TEXT,
+    "操作" TEXT NOT NULL,
+    "队伍名称" TEXT,
+    "序号" INTEGER,
+    "组别" TEXT,
+    "工位" TEXT,
+    "原始分" REAL
+);
+CREATE INDEX IF NOT EXISTS idx_journal_event ON journal (event, seq);
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    event TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    recorded_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_snapshots_event ON snapshots (event, recorded_at);
+CREATE TABLE IF NOT EXISTS snapshot_teams (
+    snapshot_id INTEGER NOT NULL,
+    "组别" TEXT,
+    "工位" TEXT,
+    "队伍名称" TEXT,
+    "原始分" REAL
+);
+CREATE INDEX IF NOT EXISTS idx_snapshot_teams ON snapshot_teams (snapshot_id);
+CREATE TABLE IF NOT EXISTS calculations (
+    event TEXT NOT NULL,
+    recorded_at TEXT NOT NULL,
+    source TEXT,
+    min_std REAL,
+    data_hash TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_calculations_event ON calculations (event, recorded_at);
+"""
+
+
+def _quoted(columns):
+    return ", ".join(f'"{col}"' for col in columns)
+
+
+def _timestamp(at=None):
+    """日志时间戳：精确到毫秒的 ISO 格式字符串，可直接按字符串比较先后"""
+    if isinstance(at, str):
+        at = datetime.fromisoformat(at)
+    return (at or datetime.now()).isoformat(timespec="milliseconds")
+
+
+class CompetitionStore:
+    """赛事数据存储；每次操作使用独立连接，可在多个会话线程间共享"""
+
+    def __init__(self, path=None):
+        self.path = str(path or os.environ.get(DB_PATH_ENV) or DEFAULT_DB_PATH)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        """打开连接并在一个事务中执行，正常结束时提交、出错时回滚"""
+        with closing(sqlite3.connect(self.path, timeout=30)) as conn:
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                yield conn
+
+    def _write_rows(self, conn, table, event, frame, columns, positions=None):
+        """写入赛事数据：positions 为 None 时删除原有数据后批量写入整表，否则只按行号更新这些位置的行"""
+        if positions is None:
+            conn.execute(f"DELETE FROM {table} WHERE event = ?", (event,))
+            conn.executemany(
+                f'INSERT INTO {table} (event, "行号", {_quoted(columns)}) VALUES (?, ?{", ?" * len(columns)})',
+                ((event, row, *values) for row, values in enumerate(frame[columns].itertuples(index=False, name=None))),
+            )
+            return
+        assignments = ", ".join(f'"{col}" = ?' for col in columns)
+        conn.executemany(
+            f'UPDATE {table} SET {assignments} WHERE event = ? AND "行号" = ?',
+            (
+                (*values, event, int(row))
+                for row, values in zip(positions, frame[columns].iloc[positions].itertuples(index=False, name=None))
+            ),
+        )
+
+    def _read_rows(self, conn, table, event, columns):
+        return pd.read_sql_query(
+            f'SELECT {_quoted(columns)} FROM {table} WHERE event = ? ORDER BY "行号"',
+            conn,
+            params=(event,),
+        )
+
+    def _touch(self, conn, event, min_std=None, data_hash=None):
+        """更新赛事的修改时间与计算参数，并递增数据版本号，返回新的版本号"""
+        conn.execute(
+            """
+            INSERT INTO events (event, updated_at, min_std, data_hash, revision) VALUES (?, ?, ?, ?, 1)
+            ON CONFLICT (event) DO UPDATE SET
+                updated_at = excluded.updated_at,
+                min_std = COALESCE(excluded.min_std, events.min_std),
+                data_hash = COALESCE(excluded.data_hash, events.data_hash),
+                revision = events.revision + 1
+            """,
+            (event, datetime.now().isoformat(timespec="seconds"), min_std, data_hash),
+        )
+        return conn.execute("SELECT revision FROM events WHERE event = ?", (event,)).fetchone()[0]
+
+    def event_revision(self, event):
+        """赛事数据的版本号，每次保存成绩表或计算结果（无论来自哪个进程）递增；没有保存过时返回 0"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT revision FROM events WHERE event = ?", (event,)).fetchone()
+        return 0 if row is None else row[0]
+
+    def _snapshot(self, conn, event, team_data, recorded_at):
+        """保存成绩表快照，快照对应该赛事目前最后一条日志"""
+        seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM journal WHERE event = ?", (event,)).fetchone()[0]
+        snapshot_id = conn.execute(
+            "INSERT INTO snapshots (event, seq, recorded_at) VALUES (?, ?, ?)", (event, seq, recorded_at),
+        ).lastrowid
+        conn.executemany(
+            f"INSERT INTO snapshot_teams (snapshot_id, {_quoted(REQUIRED_COLUMNS)}) "
+            f"VALUES (?{', ?' * len(REQUIRED_COLUMNS)})",
+            ((snapshot_id, *row) for row in team_data[REQUIRED_COLUMNS].itertuples(index=False, name=None)),
+        )
+
+    def _save_teams(self, conn, event, team_data, source, recorded_at, positions=None):
+        """保存赛事的队伍成绩表，并把与原成绩表的差异追加到修改日志
+
+        positions 为原位修改了取值的队伍位置（队伍及其顺序不变），只写入这些行；
+        为 None 时与原成绩表整表比较后替换。
+        日志累计到 SNAPSHOT_INTERVAL 条，或仅凭日志无法重现新成绩表的队伍顺序（如上传了重新排序的文件）时，
+        另外保存一份快照；只调整了队伍顺序时记一条重排标记，使这次保存出现在修改记录中。
+        """
+        last_snapshot = conn.execute("SELECT MAX(seq) FROM snapshots WHERE event = ?", (event,)).fetchone()[0]
+        old = None
+        journaled = conn.execute("SELECT 1 FROM journal WHERE event = ? LIMIT 1", (event,)).fetchone()
+        if last_snapshot is None and journaled is None:
+            old = self._read_rows(conn, "teams", event, REQUIRED_COLUMNS)
+            if not old.empty:
+                # 启用修改日志之前已保存的成绩表作为第一份快照
+                self._snapshot(conn, event, old, recorded_at)
+
+        reordered = False
+        if positions is None:
+            if old is None:
+                old = self._read_rows(conn, "teams", event, REQUIRED_COLUMNS)
+            entries = diff_teams(old, team_data)
+            reordered = not same_order(apply_entries(old, entries), team_data)
+            if entries.empty and reordered:
+                entries = reorder_marker()
+        else:
+            # 原位修改时队伍名称不变，同名队伍中的出现序号即表中位置在前的同名队伍数
+            occurrence = [
+                conn.execute(
+                    'SELECT COUNT(*) FROM teams WHERE event = ? AND "队伍名称" = ? AND "行号" < ?',
+                    (event, name, int(row)),
+                ).fetchone()[0]
+                for row, name in zip(positions, team_data["队伍名称"].iloc[positions])
+            ]
+            entries = upsert_entries(team_data, positions, occurrence)
+        conn.executemany(
+            f"INSERT INTO journal (event, recorded_at, source, {_quoted(JOURNAL_COLUMNS)}) "
+            f"VALUES (?, ?, ?{', ?' * len(JOURNAL_COLUMNS)})",
+            (
+                (event, recorded_at, source, *row)
+                for row in entries.astype(object).where(entries.notna(), None).itertuples(index=False, name=None)
+            ),
+        )
+        self._write_rows(conn, "teams", event, team_data, REQUIRED_COLUMNS, positions)
+
+        pending = conn.execute(
+            "SELECT COUNT(*) FROM journal WHERE event = ? AND seq > ?", (event, last_snapshot or 0),
+        ).fetchone()[0]
+        if pending >= SNAPSHOT_INTERVAL or reordered:
+            self._snapshot(conn, event, team_data, recorded_at)
+
+    def save_teams(self, event, team_data, source=SOURCE_UPLOAD):
+        """保存赛事的队伍成绩表（整表替换），变化记入修改日志，返回新的数据版本号"""
+        with self._connect() as conn:
+            self._save_teams(conn, event, team_data, source, _timestamp())
+            return self._touch(conn, event)
+
+    def load_teams(self, event):
+        """读取赛事的队伍成绩表，没有保存过时返回 None"""
+        with self._connect() as conn:
+            if conn.execute("SELECT 1 FROM events WHERE event = ?", (event,)).fetchone() is None:
+                return None
+            return self._read_rows(conn, "teams", event, REQUIRED_COLUMNS)
+
+    def save_results(
+        self, event, team_data, result_data, space_stats, min_std, data_hash, source=SOURCE_EDITOR,
+        changes=None, base_revision=None,
+    ):
+        """在同一事务中保存队伍成绩表、计算结果与计分空间统计，成绩表变化与本次计算参数记入修改日志
+
+        changes 为相对于版本 base_revision 的数据需要写入的行（RowChanges），只写入这些行；
+        数据库中的赛事已不是该版本（如被其他进程更新）或 changes 为 None 时整表写入。
+        返回新的数据版本号。
+        """
+        recorded_at = _timestamp()
+        with self._connect() as conn:
+            revision = conn.execute("SELECT revision FROM events WHERE event = ?", (event,)).fetchone()
+            if changes is None or revision is None or revision[0] != base_revision:
+                changes = RowChanges(None, None, None)
+            self._save_teams(conn, event, team_data, source, recorded_at, changes.teams)
+            conn.execute(
+                "INSERT INTO calculations (event, recorded_at, source, min_std, data_hash) VALUES (?, ?, ?, ?, ?)",
+                (event, recorded_at, source, min_std, data_hash),
+            )
+            self._write_rows(conn, "results", event, result_data, RESULT_COLUMNS, changes.rows)
+            self._write_rows(conn, "space_stats", event, space_stats, SPACE_STATS_COLUMNS, changes.spaces)
+            return self._touch(conn, event, min_std, data_hash)
+
+    def result_meta(self, event):
+        """读取赛事最近一次计算使用的 (min_std, data_hash)，没有计算结果时返回 None"""
+        with self._connect() as conn:
+            meta = conn.execute("SELECT min_std, data_hash FROM events WHERE event = ?", (event,)).fetchone()
+        return None if meta is None or meta[1] is None else meta
+
+    def load_results(self, event):
+        """读取赛事的计算结果
+
+        返回:
+            (result_data, space_stats, min_std, data_hash)，没有计算结果时返回 None
+        """
+        with self._connect() as conn:
+            meta = conn.execute("SELECT min_std, data_hash FROM events WHERE event = ?", (event,)).fetchone()
+            if meta is None or meta[1] is None:
+                return None
+            result_data = self._read_rows(conn, "results", event, RESULT_COLUMNS)
+            if result_data.empty:
+                return None
+            space_stats = self._read_rows(conn, "space_stats", event, SPACE_STATS_COLUMNS)
+        # 与计算结果保持一致，组别、工位、计分空间以分类列返回，奖项为按默认获奖比例排列的有序分类列
+        result_data = result_data.astype({
+            "组别": "category", "工位": "category", "计分空间": "category", "奖项": award_dtype(),
+        })
+        return result_data, space_stats, meta[0], meta[1]
+
+    def history(self, event):
+        """赛事的修改与计算记录，按时间先后排列
+
+        每次保存一行：记录时间、来源、更新与删除的队伍数量、是否只调整了队伍顺序，
+        以及该次计算使用的最小标准差（只修改成绩表时为空）。
+        """
+        with self._connect() as conn:
+            changes = pd.read_sql_query(
+                """
+                SELECT recorded_at, source, SUM("操作" = ?) AS "更新队伍数", SUM("操作" = ?) AS "删除队伍数",
+                       MAX("操作" = ?) AS "调整顺序"
+                FROM journal WHERE event = ? GROUP BY recorded_at, source
+                """,
+                conn,
+                params=(UPSERT, DELETE, REORDER, event),
+            )
+            calculations = pd.read_sql_query(
+                'SELECT recorded_at, source, min_std AS "最小标准差" FROM calculations WHERE event = ?',
+                conn,
+                params=(event,),
+            )
+        history = changes.merge(calculations, on=["recorded_at", "source"], how="outer")
+        # 只有计算、没有修改成绩表的保存在日志中没有条目，计数为 0
+        counts = ["更新队伍数", "删除队伍数", "调整顺序"]
+        history[counts] = history[counts].astype("float64").fillna(0)
+        history = history.astype({"更新队伍数": int, "删除队伍数": int, "调整顺序": bool, "最小标准差": "float64"})
+        return (
+            history.sort_values("recorded_at", kind="stable")
+            .rename(columns={"recorded_at": "记录时间", "source": "来源"})
+            .reset_index(drop=True)
+        )
+
+    def replay_teams(self, event, at):
+        """重建赛事在 at 时刻（datetime 或 ISO 格式字符串）的队伍成绩表
+
+        从 at 之前最近的快照出发，只应用其后到 at 为止的日志；at 之前没有任何记录时返回 None。
+        """
+        at = _timestamp(at)
+        with self._connect() as conn:
+            snapshot = conn.execute(
+                "SELECT id, seq FROM snapshots WHERE event = ? AND recorded_at <= ? ORDER BY id DESC LIMIT 1",
+                (event, at),
+            ).fetchone()
+            snapshot_id, since = snapshot if snapshot is not None else (None, 0)
+            base = pd.read_sql_query(
+                f"SELECT {_quoted(REQUIRED_COLUMNS)} FROM snapshot_teams WHERE snapshot_id = ? ORDER BY rowid",
+                conn,
+                params=(snapshot_id,),
+            )
+            entries = pd.read_sql_query(
+                f"SELECT {_quoted(JOURNAL_COLUMNS)} FROM journal WHERE event = ? AND seq > ? AND recorded_at <= ? ORDER BY seq",
+                conn,
+                params=(event, since, at),
+            )
+        if snapshot is None and entries.empty:
+            return None
+        return apply_entries(base, entries)
+
+    def calculation_at(self, event, at):
+        """at 时刻生效的最近一次计算的 (min_std, data_hash)，此前没有计算过时返回 None"""
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT min_std, data_hash FROM calculations WHERE event = ? AND recorded_at <= ? "
+                "ORDER BY rowid DESC LIMIT 1",
+                (event, _timestamp(at)),
+            ).fetchone()